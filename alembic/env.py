@@ -29,7 +29,7 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # Import all models to ensure they're registered
 from app import db  # noqa: E402
-from app import User, Customer, Vehicle, Item, Invoice, InvoiceItem, Waybill, Settings, AuditLog  # noqa: E402, F401
+from app import User, Customer, Vehicle, Item, Invoice, InvoiceItem, Waybill, Settings, Counter, AuditLog  # noqa: E402, F401
 
 target_metadata = db.Model.metadata
 
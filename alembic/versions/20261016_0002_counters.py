@@ -0,0 +1,29 @@
+"""add counters table for bill numbers
+
+Revision ID: 20261016_0002
+Revises: 20241114_0001
+Create Date: 2026-10-16 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0002"
+down_revision = "20241114_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The "invoice" row is seeded by init_db() / get_next_bill_no() from the
+    # last existing bill number, so no data migration is needed here.
+    op.create_table(
+        "counters",
+        sa.Column("name", sa.String(length=50), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("counters")
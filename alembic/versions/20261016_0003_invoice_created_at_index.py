@@ -0,0 +1,22 @@
+"""index invoices.created_at
+
+Revision ID: 20261016_0003
+Revises: 20261016_0002
+Create Date: 2026-10-16 11:00:00.000000
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0003"
+down_revision = "20261016_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_invoices_created_at", "invoices", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoices_created_at", table_name="invoices")
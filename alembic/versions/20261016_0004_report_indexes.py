@@ -0,0 +1,30 @@
+"""index invoice report filters and lookups
+
+Revision ID: 20261016_0004
+Revises: 20261016_0003
+Create Date: 2026-10-16 12:00:00.000000
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0004"
+down_revision = "20261016_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_invoices_date", "invoices", ["date"])
+    op.create_index("ix_invoices_customer_id_date", "invoices", ["customer_id", "date"])
+    op.create_index("ix_invoices_vehicle_id", "invoices", ["vehicle_id"])
+    op.create_index("ix_invoice_items_invoice_id", "invoice_items", ["invoice_id"])
+    op.create_index("ix_customers_name", "customers", ["name"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_customers_name", table_name="customers")
+    op.drop_index("ix_invoice_items_invoice_id", table_name="invoice_items")
+    op.drop_index("ix_invoices_vehicle_id", table_name="invoices")
+    op.drop_index("ix_invoices_customer_id_date", table_name="invoices")
+    op.drop_index("ix_invoices_date", table_name="invoices")
@@ -0,0 +1,45 @@
+"""add per-customer daily invoice totals
+
+Revision ID: 20261016_0005
+Revises: 20261016_0004
+Create Date: 2026-10-16 14:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0005"
+down_revision = "20261016_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "invoice_daily_totals",
+        sa.Column("customer_id", sa.Integer(), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("invoice_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("subtotal", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("cgst", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("sgst", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("grand_total", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_invoice_daily_totals_day", "invoice_daily_totals", ["day"])
+    # From here on the app keeps the table in step with every invoice write
+    op.execute(
+        """
+        INSERT INTO invoice_daily_totals
+            (customer_id, day, invoice_count, subtotal, cgst, sgst, grand_total)
+        SELECT customer_id, date(date), count(id),
+               sum(subtotal), sum(cgst), sum(sgst), sum(grand_total)
+        FROM invoices
+        GROUP BY customer_id, date(date)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoice_daily_totals_day", table_name="invoice_daily_totals")
+    op.drop_table("invoice_daily_totals")
@@ -0,0 +1,27 @@
+"""index invoices by vehicle and date
+
+Revision ID: 20261016_0006
+Revises: 20261016_0005
+Create Date: 2026-10-16 15:00:00.000000
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0006"
+down_revision = "20261016_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The vehicle report lists a vehicle's bills newest first; with date in
+    # the index that is a backwards index scan instead of a sort, and the
+    # composite still covers plain vehicle_id lookups
+    op.create_index("ix_invoices_vehicle_id_date", "invoices", ["vehicle_id", "date"])
+    op.drop_index("ix_invoices_vehicle_id", table_name="invoices")
+
+
+def downgrade() -> None:
+    op.create_index("ix_invoices_vehicle_id", "invoices", ["vehicle_id"])
+    op.drop_index("ix_invoices_vehicle_id_date", table_name="invoices")
@@ -0,0 +1,25 @@
+"""index invoices by customer and creation time
+
+Revision ID: 20261016_0007
+Revises: 20261016_0006
+Create Date: 2026-10-16 16:00:00.000000
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0007"
+down_revision = "20261016_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Customer detail (and a customer user's recent invoices) filter by
+    # customer and order by created_at DESC; this serves both without a sort
+    op.create_index(
+        "ix_invoices_customer_id_created_at", "invoices", ["customer_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoices_customer_id_created_at", table_name="invoices")
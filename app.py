@@ -1,4 +1,7 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, flash
+from flask import (
+    Flask, render_template, request, redirect, url_for, jsonify, send_file, flash,
+    make_response, abort, Response, stream_with_context,
+)
 from flask_login import (
     LoginManager,
     UserMixin,
@@ -7,22 +10,46 @@ from flask_login import (
     login_required,
     current_user,
 )
+from jinja2 import FileSystemBytecodeCache
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import desc, or_
+from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy import (
+    desc, or_, select, insert, delete, func, case, cast, extract, bindparam,
+    table, column, literal_column, Select,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import load_only, joinedload, selectinload, contains_eager, raiseload
 from datetime import datetime, timedelta
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
 import os
 import io
+import sqlite3
+import logging
+import time
+import atexit
+import threading
+import hashlib
+import tempfile
 import csv
+import gzip
 import json
 import re
-from functools import wraps
+from collections import OrderedDict, deque
+from functools import wraps, lru_cache
+from itertools import islice
+from types import SimpleNamespace
 from flask import session, g
 
-from database import db, configure_database, is_database_ready
+from database import (
+    db,
+    configure_database,
+    is_database_ready,
+    sqlite_database_path,
+    backup_sqlite_database,
+)
 
 # Import messaging utilities
 try:
@@ -42,10 +69,38 @@ except ImportError:
     def format_template(*args, **kwargs):
         return ""
 
+# Optional faster JSON encoder for backups
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# File locks let one worker at a time write the backup (POSIX only)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Optional HTML->PDF renderer (needs the WeasyPrint package and its system libraries)
+try:
+    from weasyprint import HTML
+except (ImportError, OSError):
+    HTML = None
+
+# Request-path diagnostics; %-style arguments are only formatted when the
+# record is actually emitted
+logger = logging.getLogger("crusher_billing")
+
 # ------------------------------------------------------------
 # Flask configuration
 # ------------------------------------------------------------
 RUNNING_ON_VERCEL = os.getenv("VERCEL", "0") == "1"
+# Rows per page on admin list views
+ADMIN_PAGE_SIZE = 50
+# Invoice rows per page on the monthly/customer/vehicle reports
+REPORT_PAGE_SIZE = 50
+# "reportlab" (default) or "weasyprint" to lay invoices out from templates/invoice_pdf.html
+PDF_ENGINE = os.getenv("PDF_ENGINE", "reportlab").lower()
 
 # ------------------------------------------------------------
 # Login manager setup (will be initialized in create_app)
@@ -53,6 +108,40 @@ RUNNING_ON_VERCEL = os.getenv("VERCEL", "0") == "1"
 login_manager = LoginManager()
 login_manager.login_view = "login"
 
+# ------------------------------------------------------------
+# Rate limiting - bounds the CPU spent on password hash checks
+# ------------------------------------------------------------
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=os.getenv("RATELIMIT_STORAGE_URI", "memory://"),
+    default_limits=[],
+)
+LOGIN_RATE_LIMIT = os.getenv("LOGIN_RATE_LIMIT", "10 per minute")
+# Reverse proxies in front of the app (Vercel's edge counts as one); their
+# X-Forwarded-For entries give the real client address
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "1" if RUNNING_ON_VERCEL else "0"))
+
+
+def login_rate_key():
+    """Rate-limit bucket for a login attempt: client address plus username,
+    so one client guessing can't lock everyone else out"""
+    username = request.form.get("username", "").strip().lower()
+    return f"{get_remote_address()}:{username}"
+
+
+# How stale User.last_login may get before a login writes it again
+LAST_LOGIN_RESOLUTION = timedelta(hours=1)
+
+# Werkzeug's default KDF. A cheaper method (e.g. "pbkdf2:sha256:100000")
+# speeds up logins at the cost of brute-force resistance; existing users are
+# re-hashed with the configured method on their next successful login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+
+def hash_password(password):
+    """Hash a password with the configured PASSWORD_HASH_METHOD"""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
 
 # ------------------------------------------------------------
 # Database models
@@ -76,7 +165,21 @@ class User(UserMixin, db.Model):
     customer = db.relationship("Customer", foreign_keys=[customer_id])
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        """Verify a password against the stored hash.
+
+        This pays the full KDF cost, so only the login form calls it;
+        every other request (including /api/*) is authenticated by the
+        Flask-Login session.
+        """
+        if not check_password_hash(self.password_hash, password):
+            return False
+        # Upgrade (or downgrade) the stored hash when the method changed;
+        # the caller's commit persists it
+        stored = self.password_hash.split("$", 1)[0].split(":")
+        wanted = PASSWORD_HASH_METHOD.split(":")
+        if stored[:len(wanted)] != wanted:
+            self.password_hash = hash_password(password)
+        return True
 
     def is_active_user(self):
         return self.status == "active"
@@ -85,13 +188,15 @@ class User(UserMixin, db.Model):
 class Customer(db.Model):
     __tablename__ = "customers"
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(200), nullable=False)
+    # create_bill looks customers up by exact name
+    name = db.Column(db.String(200), nullable=False, index=True)
     gst_number = db.Column(db.String(50), nullable=True)
     phone = db.Column(db.String(20), nullable=True)
     address = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    invoices = db.relationship("Invoice", back_populates="customer")
+    # Never read through the ORM - raise instead of silently lazy loading
+    invoices = db.relationship("Invoice", back_populates="customer", lazy="raise")
 
 
 class Vehicle(db.Model):
@@ -105,7 +210,8 @@ class Vehicle(db.Model):
         nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    invoices = db.relationship("Invoice", back_populates="vehicle")
+    customer = db.relationship("Customer", foreign_keys=[customer_id])
+    invoices = db.relationship("Invoice", back_populates="vehicle", lazy="raise")
 
 
 class Item(db.Model):
@@ -123,9 +229,18 @@ class Item(db.Model):
 
 class Invoice(db.Model):
     __tablename__ = "invoices"
+    # Reports filter on a date range, optionally for one customer or
+    # vehicle; the composite indexes also serve lookups by customer_id or
+    # vehicle_id alone, already in date order
+    __table_args__ = (
+        db.Index("ix_invoices_customer_id_date", "customer_id", "date"),
+        db.Index("ix_invoices_vehicle_id_date", "vehicle_id", "date"),
+        # Customer detail and a customer user's dashboard list newest first
+        db.Index("ix_invoices_customer_id_created_at", "customer_id", "created_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     bill_no = db.Column(db.String(50), unique=True, nullable=False)
-    date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     customer_id = db.Column(
         db.Integer,
         db.ForeignKey("customers.id"),
@@ -139,18 +254,26 @@ class Invoice(db.Model):
     sgst = db.Column(db.Float, nullable=False, default=0.0)
     grand_total = db.Column(db.Float, nullable=False, default=0.0)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Indexed for the dashboard's "recent invoices" ORDER BY ... LIMIT
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     from_location = db.Column(db.String(100), default="நெமிலி")
     delivery_location = db.Column(db.String(200), nullable=True)
     has_waybill = db.Column(db.Boolean, default=False)
 
-    customer = db.relationship("Customer", back_populates="invoices")
-    vehicle = db.relationship("Vehicle", back_populates="invoices")
+    # Customer and vehicle are shown wherever an invoice is, so they are
+    # joined into every invoice load
+    customer = db.relationship("Customer", back_populates="invoices", lazy="joined")
+    vehicle = db.relationship("Vehicle", back_populates="invoices", lazy="joined")
     user = db.relationship("User")
     items = db.relationship(
         "InvoiceItem",
         back_populates="invoice",
         cascade="all, delete-orphan")
+    waybill = db.relationship(
+        "Waybill",
+        back_populates="invoice",
+        uselist=False,
+        cascade="all, delete-orphan")
 
 
 class InvoiceItem(db.Model):
@@ -159,7 +282,8 @@ class InvoiceItem(db.Model):
     invoice_id = db.Column(
         db.Integer,
         db.ForeignKey("invoices.id"),
-        nullable=False)
+        nullable=False,
+        index=True)
     item_name = db.Column(db.String(200), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
     rate = db.Column(db.Float, nullable=False)
@@ -184,7 +308,7 @@ class Waybill(db.Model):
     delivery_location = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    invoice = db.relationship("Invoice", backref="waybill")
+    invoice = db.relationship("Invoice", back_populates="waybill")
 
 
 class Settings(db.Model):
@@ -238,6 +362,28 @@ class Settings(db.Model):
         onupdate=datetime.utcnow)
 
 
+class InvoiceDailyTotal(db.Model):
+    __tablename__ = "invoice_daily_totals"
+    # Running sums of each customer's invoices per day, updated in the same
+    # transaction as every invoice insert/delete (update_daily_totals), so
+    # reports and the dashboard read a handful of rows instead of scanning
+    # invoices. Rows are removed when their count drops to zero.
+    customer_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)
+    subtotal = db.Column(db.Float, nullable=False, default=0.0)
+    cgst = db.Column(db.Float, nullable=False, default=0.0)
+    sgst = db.Column(db.Float, nullable=False, default=0.0)
+    grand_total = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class Counter(db.Model):
+    __tablename__ = "counters"
+    # Named sequence, e.g. "invoice" for bill numbers
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
 class AuditLog(db.Model):
     __tablename__ = "audit_logs"
     id = db.Column(db.Integer, primary_key=True)
@@ -256,21 +402,64 @@ class AuditLog(db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Flask-Login calls this at most once per request and keeps the result
+    # on g; session.get() also serves repeat lookups from the identity map
+    return db.session.get(User, int(user_id))
 
 
 # ------------------------------------------------------------
 # Helper functions
 # ------------------------------------------------------------
+def get_last_bill_number():
+    """Highest numeric bill number so far (0 when there are no bills)
+
+    A single scalar MAX over the all-digit bill numbers; any legacy
+    non-numeric bill numbers are skipped instead of breaking the cast.
+    """
+    return db.session.execute(
+        select(func.coalesce(func.max(cast(Invoice.bill_no, db.Integer)), 0))
+        .where(Invoice.bill_no.regexp_match("^[0-9]+$"))
+    ).scalar()
+
+
 def get_next_bill_no():
-    """Generate next bill number (0001, 0002, ...)"""
-    last_invoice = Invoice.query.order_by(desc(Invoice.id)).first()
-    if last_invoice and last_invoice.bill_no:
-        try:
-            last_num = int(last_invoice.bill_no)
-            return f"{last_num + 1:04d}"
-        except BaseException:
-            return f"{last_invoice.id + 1:04d}"
+    """Generate next bill number (0001, 0002, ...)
+
+    Increments the "invoice" counter row in place. The row stays locked
+    until the caller commits, so concurrent bills cannot share a number.
+    """
+    counters = Counter.__table__
+    value = db.session.execute(
+        counters.update()
+        .where(counters.c.name == "invoice")
+        .values(value=counters.c.value + 1)
+        .returning(counters.c.value)
+    ).scalar()
+    if value is None:
+        # Counter not seeded yet - continue from the existing bills
+        value = get_last_bill_number() + 1
+        db.session.execute(counters.insert().values(name="invoice", value=value))
+    return f"{value:04d}"
+
+
+def get_version(name):
+    """Current value of a version counter row (0 before its first bump)"""
+    return db.session.execute(
+        select(Counter.value).where(Counter.name == name)).scalar() or 0
+
+
+def bump_version(name):
+    """Increment a version counter row in the caller's transaction.
+
+    Per-process caches remember the version they were filled at, so once
+    the write commits every worker reloads on its next read.
+    """
+    dialect_insert = (postgresql_insert if db.engine.dialect.name == "postgresql"
+                      else sqlite_insert)
+    bump = dialect_insert(Counter).values(name=name, value=1)
+    db.session.execute(bump.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"value": Counter.__table__.c.value + 1}))
 
 
 def get_settings():
@@ -283,6 +472,212 @@ def get_settings():
     return settings
 
 
+# Counter row bumped by every settings save
+SETTINGS_VERSION_COUNTER = "settings"
+_settings_cache = {"snapshot": None, "version": None}
+
+
+def get_cached_settings():
+    """Read-only copy of the settings row for request paths that only read it.
+
+    Cached per process and checked against the settings version on every
+    read, so GST rates and company details saved by any worker apply to
+    the next bill. Code that edits settings must use get_settings() instead.
+    """
+    version = get_version(SETTINGS_VERSION_COUNTER)
+    snapshot = _settings_cache["snapshot"]
+    if snapshot is None or _settings_cache["version"] != version:
+        settings = get_settings()
+        snapshot = SimpleNamespace(**{
+            column.key: getattr(settings, column.key)
+            for column in Settings.__table__.columns})
+        _settings_cache["snapshot"] = snapshot
+        _settings_cache["version"] = version
+    return snapshot
+
+
+def get_gst_rates(settings):
+    """Get (cgst, sgst) as multipliers, e.g. 2.5% -> 0.025"""
+    return settings.cgst_percent * 0.01, settings.sgst_percent * 0.01
+
+
+# Counter row bumped by every item write
+ITEMS_VERSION_COUNTER = "items"
+_items_cache = {"active": None, "version": None}
+
+
+def get_active_items():
+    """Get active items as plain dicts, cached until an item is modified.
+
+    The cache is checked against the items version on every read, so an
+    item added, repriced or deactivated by any worker shows up here at
+    once. The cached sequence is a tuple since every request shares it.
+    """
+    version = get_version(ITEMS_VERSION_COUNTER)
+    if _items_cache["active"] is None or _items_cache["version"] != version:
+        items = Item.query.filter_by(is_active=True).order_by(Item.name).all()
+        _items_cache["active"] = tuple({"id": item.id, "name": item.name,
+                                        "rate": float(item.rate)} for item in items)
+        _items_cache["version"] = version
+    return _items_cache["active"]
+
+
+def render_bill_form():
+    """Re-render the create bill form, e.g. after a rejected submission"""
+    items_data = get_active_items()
+    return render_template(
+        "create_bill.html", items=items_data, items_data=items_data)
+
+
+DAILY_TOTAL_AMOUNTS = ("subtotal", "cgst", "sgst", "grand_total")
+
+
+def update_daily_totals(invoice, sign=1):
+    """Add (sign=1) or take back (sign=-1) one invoice in its day's totals.
+
+    invoice is any mapping with customer_id, date and the amount columns.
+    Runs in the caller's transaction, so the summary commits or rolls
+    back together with the invoice itself.
+    """
+    key = {"customer_id": invoice["customer_id"], "day": invoice["date"].date()}
+    dialect_insert = (postgresql_insert if db.engine.dialect.name == "postgresql"
+                      else sqlite_insert)
+    upsert = dialect_insert(InvoiceDailyTotal).values(
+        invoice_count=sign,
+        **key,
+        **{name: sign * invoice[name] for name in DAILY_TOTAL_AMOUNTS})
+    totals = InvoiceDailyTotal.__table__.c
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=["customer_id", "day"],
+        set_={name: totals[name] + upsert.excluded[name]
+              for name in ("invoice_count",) + DAILY_TOTAL_AMOUNTS}))
+    if sign < 0:
+        db.session.execute(delete(InvoiceDailyTotal).filter_by(**key).where(
+            InvoiceDailyTotal.invoice_count <= 0))
+
+    # Every worker's cached report totals are checked against this version
+    bump_version(TOTALS_VERSION_COUNTER)
+
+
+def backfill_daily_totals():
+    """Build the daily totals from existing invoices when the table is empty"""
+    if db.session.query(InvoiceDailyTotal.day).first() is not None:
+        return
+    day = func.date(Invoice.date)
+    db.session.execute(insert(InvoiceDailyTotal).from_select(
+        ["customer_id", "day", "invoice_count"] + list(DAILY_TOTAL_AMOUNTS),
+        select(Invoice.customer_id, day, func.count(Invoice.id),
+               *(func.sum(getattr(Invoice, name)) for name in DAILY_TOTAL_AMOUNTS))
+        .group_by(Invoice.customer_id, day)))
+    db.session.commit()
+
+
+def get_daily_totals_query(scope):
+    """Daily totals visible to a user scope (see get_invoice_scope())"""
+    if scope == "all":
+        return InvoiceDailyTotal.query
+    return InvoiceDailyTotal.query.filter_by(customer_id=scope)
+
+
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+_dashboard_cache = {}
+
+
+def get_dashboard_stats(scope):
+    """Dashboard totals for a user scope, cached for DASHBOARD_CACHE_TTL seconds.
+
+    Only plain numbers are cached; ORM rows stay per-request so they are
+    never shared between sessions. The customer count rides along for the
+    "all" scope, so a warm dashboard needs no aggregate queries at all.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    key = (scope, today.date())
+    cached = _dashboard_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < DASHBOARD_CACHE_TTL:
+        return cached[1]
+
+    # Today is always inside the current month, so one pass over this
+    # month's daily totals yields both sets of figures
+    month_start = today.date().replace(day=1)
+    is_today = InvoiceDailyTotal.day >= today.date()
+    today_total, today_count, monthly_total = get_daily_totals_query(scope).filter(
+        InvoiceDailyTotal.day >= month_start).with_entities(
+        func.coalesce(func.sum(case((is_today, InvoiceDailyTotal.grand_total))), 0.0),
+        func.coalesce(func.sum(case((is_today, InvoiceDailyTotal.invoice_count))), 0),
+        func.coalesce(func.sum(InvoiceDailyTotal.grand_total), 0.0)).one()
+
+    stats = {
+        "today_count": today_count,
+        "today_total": today_total,
+        "monthly_total": monthly_total,
+    }
+    if scope == "all":
+        stats["customer_count"] = Customer.query.count()
+    _dashboard_cache[key] = (time.monotonic(), stats)
+    return stats
+
+
+def invalidate_dashboard_cache():
+    """Drop cached dashboard totals after an invoice or customer write"""
+    _dashboard_cache.clear()
+
+
+def get_invoice_scope():
+    """Cache scope for the current user: "all" or their customer id"""
+    if current_user.role in ["admin", "staff"]:
+        return "all"
+    return current_user.customer_id
+
+
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "3600"))
+# Counter row bumped by update_daily_totals() on every invoice write
+TOTALS_VERSION_COUNTER = "daily_totals"
+_report_cache = {}
+
+
+def get_report_totals(report, scope, start, compute):
+    """Aggregates for a report period, cached per user scope.
+
+    A cached copy is only used while the totals version it was computed at
+    is still current, so a bill created (even backdated) or deleted by any
+    worker shows up on the next request; REPORT_CACHE_TTL bounds how long
+    an entry is kept at all. compute() runs the queries on a miss and must
+    return plain values.
+    """
+    key = (report, scope, start)
+    version = get_version(TOTALS_VERSION_COUNTER)
+    cached = _report_cache.get(key)
+    if (cached is not None and cached[1] == version
+            and time.monotonic() - cached[0] < REPORT_CACHE_TTL):
+        return cached[2]
+
+    totals = compute()
+    _report_cache[key] = (time.monotonic(), version, totals)
+    return totals
+
+
+def invalidate_report_cache():
+    """Drop cached report totals after an invoice write"""
+    _report_cache.clear()
+
+
+def invoice_etag(invoice, settings, variant=""):
+    """Strong ETag for an invoice view.
+
+    Invoices are not edited after creation; the settings timestamp covers
+    company details and GST rates rendered alongside them.
+    """
+    raw = f"{invoice.id}:{invoice.bill_no}:{invoice.grand_total}:{settings.updated_at}:{variant}"
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def not_modified(etag):
+    """Empty 304 response for a matching If-None-Match"""
+    response = make_response("", 304)
+    response.set_etag(etag)
+    return response
+
+
 def admin_required(f):
     """Decorator to require admin role"""
     from functools import wraps
@@ -330,27 +725,323 @@ def role_required(role):
                 return redirect(url_for("dashboard"))
 
 
+def read_only(f):
+    """Decorator for read-only views: no autoflush while the view and its
+    template load invoices"""
+    from functools import wraps
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with db.session.no_autoflush:
+            return f(*args, **kwargs)
+
+    return decorated_function
+
+
+# Audit rows waiting to be written; the audit-writer thread drains them in
+# batches, or request teardown flushes them on serverless deployments
+_audit_queue = deque()
+# Seconds between background audit writes, and the backlog that triggers an
+# early write
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2"))
+AUDIT_FLUSH_BATCH = 100
+_audit_wakeup = threading.Event()
+_audit_writer = None
+
+
 def log_audit(
         action,
         resource_type=None,
         resource_id=None,
         details=None,
         ip_address=None):
-    """Log an audit event"""
+    """Queue an audit event - written in a later batch by flush_audit_queue()"""
     try:
-        log = AuditLog(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            details=details,
-            ip_address=ip_address or request.remote_addr
-        )
-        db.session.add(log)
-        db.session.commit()
+        _audit_queue.append({
+            "user_id": current_user.id if current_user.is_authenticated else None,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details,
+            "ip_address": ip_address or request.remote_addr,
+            "created_at": datetime.utcnow(),
+        })
+        if len(_audit_queue) >= AUDIT_FLUSH_BATCH:
+            _audit_wakeup.set()
     except Exception as e:
-        print(f"Error logging audit: {e}")
+        logger.warning("Error logging audit: %s", e)
+
+
+def flush_audit_queue():
+    """Write all queued audit events in a single transaction"""
+    rows = []
+    while _audit_queue:
+        try:
+            rows.append(_audit_queue.popleft())
+        except IndexError:
+            break
+    if not rows:
+        return
+    try:
+        # Own connection, so a failed request session cannot drop the log
+        with db.engine.begin() as conn:
+            conn.execute(AuditLog.__table__.insert(), rows)
+    except Exception as e:
+        logger.warning("Error writing audit log: %s", e)
+
+
+def start_audit_writer(app):
+    """Drain the audit queue from a daemon thread, batching many events per commit.
+
+    Requests then only append to the queue. Serverless deployments can't
+    keep a thread alive between requests, so there the queue is flushed in
+    teardown instead.
+    """
+    global _audit_writer
+    if _audit_writer is not None:
+        return
+
+    def run():
+        while True:
+            _audit_wakeup.wait(AUDIT_FLUSH_INTERVAL)
+            _audit_wakeup.clear()
+            if _audit_queue:
+                with app.app_context():
+                    flush_audit_queue()
+
+    def flush_on_exit():
+        if _audit_queue:
+            with app.app_context():
+                flush_audit_queue()
+
+    _audit_writer = threading.Thread(target=run, name="audit-writer", daemon=True)
+    _audit_writer.start()
+    atexit.register(flush_on_exit)
+
+
+# Loader options for invoice listings and single-invoice pages; templates
+# read customer and vehicle on every row
+INVOICE_PARTIES = (joinedload(Invoice.customer), joinedload(Invoice.vehicle))
+INVOICE_FULL = INVOICE_PARTIES + (selectinload(Invoice.items), selectinload(Invoice.waybill))
+# In development, a template touching a column or relationship the row
+# options didn't load raises instead of quietly querying once per row
+STRICT_ROW_LOADING = os.getenv("FLASK_ENV") == "development"
+STRICT_ROW_OPTIONS = (raiseload("*"),) if STRICT_ROW_LOADING else ()
+# Invoice table rows (search, customer detail) show only these columns
+INVOICE_ROW_COLUMNS = load_only(
+    Invoice.bill_no, Invoice.date, Invoice.grand_total,
+    Invoice.customer_id, Invoice.vehicle_id, raiseload=STRICT_ROW_LOADING)
+INVOICE_ROW_OPTIONS = (
+    INVOICE_ROW_COLUMNS,
+    joinedload(Invoice.customer).load_only(Customer.name, raiseload=STRICT_ROW_LOADING),
+    joinedload(Invoice.vehicle).load_only(Vehicle.vehicle_number, raiseload=STRICT_ROW_LOADING),
+) + STRICT_ROW_OPTIONS
+
+
+def get_invoice_or_404(invoice_id):
+    """Load an invoice with everything the detail page and PDF draw"""
+    invoice = db.session.get(Invoice, invoice_id, options=INVOICE_FULL)
+    if invoice is None:
+        abort(404)
+    return invoice
+
+
+# New-bill SMS/WhatsApp waiting for the notification thread, as
+# (invoice_id, base_url)
+_notification_queue = deque()
+_notification_wakeup = threading.Event()
+_notification_sender = None
+
+
+def queue_invoice_notification(invoice_id, base_url):
+    """Hand a new bill's notifications to the background sender.
+
+    Returns False when no sender thread is running (serverless), and the
+    caller then sends them inline.
+    """
+    if _notification_sender is None:
+        return False
+    _notification_queue.append((invoice_id, base_url))
+    _notification_wakeup.set()
+    return True
+
+
+def send_queued_notifications():
+    """Send every queued invoice notification, logging failed deliveries"""
+    while _notification_queue:
+        try:
+            invoice_id, base_url = _notification_queue.popleft()
+        except IndexError:
+            break
+        try:
+            settings = get_cached_settings()
+            invoice = db.session.get(Invoice, invoice_id, options=INVOICE_PARTIES)
+            if invoice is None:
+                continue
+            results = send_invoice_notification(settings, invoice, base_url)
+            for channel, enabled in (("sms", settings.auto_send_sms),
+                                     ("whatsapp", settings.auto_send_whatsapp)):
+                result = results.get(channel, {})
+                if enabled and not result.get("success"):
+                    logger.warning("⚠️ Bill %s %s not sent: %s",
+                                   invoice.bill_no, channel, result.get("error"))
+        except Exception as e:
+            logger.warning("⚠️ Error sending notifications: %s", e)
+        finally:
+            db.session.remove()
+
+
+def start_notification_sender(app):
+    """Send new-bill SMS/WhatsApp from a daemon thread.
+
+    create_bill then returns as soon as the bill is committed instead of
+    waiting on the provider's API. Serverless deployments can't keep the
+    thread alive, so there notifications are still sent inline.
+    """
+    global _notification_sender
+    if _notification_sender is not None:
+        return
+
+    def run():
+        while True:
+            _notification_wakeup.wait()
+            _notification_wakeup.clear()
+            with app.app_context():
+                send_queued_notifications()
+
+    def send_on_exit():
+        if _notification_queue:
+            with app.app_context():
+                send_queued_notifications()
+
+    _notification_sender = threading.Thread(
+        target=run, name="notification-sender", daemon=True)
+    _notification_sender.start()
+    atexit.register(send_on_exit)
+
+
+# ------------------------------------------------------------
+# Invoice search index (SQLite only)
+# ------------------------------------------------------------
+# A trigram FTS5 table over bill no / customer / vehicle, keyed by invoice
+# id and kept current by triggers, so substring search is an index lookup
+# instead of three leading-wildcard LIKE scans. Other backends (and queries
+# shorter than one trigram) use the ILIKE search.
+INVOICE_SEARCH_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS invoice_search USING fts5(
+        bill_no, customer_name, vehicle_number, tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS invoice_search_ai AFTER INSERT ON invoices BEGIN
+        INSERT INTO invoice_search(rowid, bill_no, customer_name, vehicle_number)
+        VALUES (NEW.id, NEW.bill_no,
+                (SELECT name FROM customers WHERE id = NEW.customer_id),
+                (SELECT vehicle_number FROM vehicles WHERE id = NEW.vehicle_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS invoice_search_au
+        AFTER UPDATE OF bill_no, customer_id, vehicle_id ON invoices BEGIN
+        UPDATE invoice_search SET
+            bill_no = NEW.bill_no,
+            customer_name = (SELECT name FROM customers WHERE id = NEW.customer_id),
+            vehicle_number = (SELECT vehicle_number FROM vehicles WHERE id = NEW.vehicle_id)
+        WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS invoice_search_ad AFTER DELETE ON invoices BEGIN
+        DELETE FROM invoice_search WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS invoice_search_customer_au
+        AFTER UPDATE OF name ON customers BEGIN
+        UPDATE invoice_search SET customer_name = NEW.name
+        WHERE rowid IN (SELECT id FROM invoices WHERE customer_id = NEW.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS invoice_search_vehicle_au
+        AFTER UPDATE OF vehicle_number ON vehicles BEGIN
+        UPDATE invoice_search SET vehicle_number = NEW.vehicle_number
+        WHERE rowid IN (SELECT id FROM invoices WHERE vehicle_id = NEW.id);
+    END""",
+)
+INVOICE_SEARCH_BACKFILL = """
+    INSERT INTO invoice_search(rowid, bill_no, customer_name, vehicle_number)
+    SELECT invoices.id, invoices.bill_no, customers.name, vehicles.vehicle_number
+    FROM invoices
+    LEFT JOIN customers ON customers.id = invoices.customer_id
+    LEFT JOIN vehicles ON vehicles.id = invoices.vehicle_id
+"""
+INVOICE_SEARCH_MIN_LENGTH = 3
+invoice_search = table("invoice_search", column("rowid"))
+_invoice_search_ready = False
+
+
+def setup_invoice_search():
+    """Create (and on first run backfill) the invoice search index on SQLite"""
+    global _invoice_search_ready
+    if db.engine.dialect.name != "sqlite" or sqlite3.sqlite_version_info < (3, 34):
+        return False
+    try:
+        exists = db.session.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'invoice_search'"
+        )).first()
+        for statement in INVOICE_SEARCH_DDL:
+            db.session.execute(db.text(statement))
+        if not exists:
+            db.session.execute(db.text(INVOICE_SEARCH_BACKFILL))
+        db.session.commit()
+        _invoice_search_ready = True
+    except Exception as err:
         db.session.rollback()
+        logger.warning("⚠️ Invoice search index unavailable, using LIKE search: %s", err)
+    return _invoice_search_ready
+
+
+def search_invoice_ids(text):
+    """Select of invoice ids whose bill no, customer or vehicle contains text,
+    or None when the search index can't answer it"""
+    if not _invoice_search_ready or len(text) < INVOICE_SEARCH_MIN_LENGTH:
+        return None
+    # A quoted FTS5 phrase; with the trigram tokenizer that is a
+    # case-insensitive substring match
+    phrase = '"' + text.replace('"', '""') + '"'
+    return select(invoice_search.c.rowid).where(
+        literal_column("invoice_search").op("MATCH")(phrase))
+
+
+# Vehicle registration, e.g. TN32AX3344 or TN10AA9988:
+# 2 letters, 2 digits, 1-2 letters, 4 digits
+VEHICLE_NUMBER_RE = re.compile(r"^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$")
+
+# Login lookup built once; only the bound username changes per request
+LOGIN_USER_STMT = select(User).where(User.username == bindparam("username"))
+
+
+# Report periods are parsed from the same few query strings over and over,
+# so the resulting (start, end) pairs are memoised
+@lru_cache(maxsize=64)
+def get_month_range(month_str):
+    """First and last moment of a YYYY-MM month; ValueError if malformed"""
+    year, month = map(int, month_str.split("-"))
+    start = datetime(year, month, 1)
+    if month == 12:
+        next_month = datetime(year + 1, 1, 1)
+    else:
+        next_month = datetime(year, month + 1, 1)
+    return start, next_month - timedelta(seconds=1)
+
+
+@lru_cache(maxsize=64)
+def get_week_range(week_str):
+    """Monday 00:00 to Sunday 23:59:59 of a YYYY-Www week; ValueError if malformed"""
+    parts = week_str.split("-W")
+    if len(parts) != 2:
+        raise ValueError("Invalid week format")
+    year, week = int(parts[0]), int(parts[1])
+    jan1 = datetime(year, 1, 1)
+    start = jan1 + timedelta(days=(week - 1) * 7 - jan1.weekday())
+    return start, start + timedelta(days=6, hours=23, minutes=59, seconds=59)
+
+
+def get_current_week_range():
+    """Monday 00:00 to Sunday 23:59:59 of this week"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=today.weekday())
+    return start, start + timedelta(days=6, hours=23, minutes=59, seconds=59)
 
 
 def get_user_invoices_query():
@@ -363,19 +1054,497 @@ def get_user_invoices_query():
         return Invoice.query.filter_by(customer_id=current_user.customer_id)
 
 
+STREAM_CHUNK_SIZE = 64 * 1024
+CSV_BATCH_SIZE = 500
+
+
+def invoice_csv_response(invoice_query, download_name):
+    """Stream the invoices in invoice_query as a CSV download.
+
+    Only the exported columns are selected, with customer and vehicle
+    joined in, and rows are fetched in batches as the file is written
+    out, so memory stays flat however many invoices the period holds.
+    """
+    rows = (
+        invoice_query
+        .join(Customer, Invoice.customer_id == Customer.id)
+        .outerjoin(Vehicle, Invoice.vehicle_id == Vehicle.id)
+        .with_entities(
+            Invoice.bill_no,
+            Customer.name,
+            func.coalesce(Vehicle.vehicle_number, ""),
+            # YYYY-MM-DD from the database (text on SQLite, a date on
+            # PostgreSQL - both print the same), so rows need no formatting
+            func.date(Invoice.date),
+            Invoice.grand_total)
+        .yield_per(CSV_BATCH_SIZE)
+    )
+
+    def generate():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        # BOM first so Excel reads the Tamil names as UTF-8
+        output.write("\ufeff")
+        writer.writerow(["Bill No", "Customer", "Vehicle", "Date", "Amount"])
+        remaining = iter(rows)
+        # Rows are already in output form, so each fetched batch goes
+        # straight to one writerows() call and out as one chunk
+        while True:
+            writer.writerows(islice(remaining, CSV_BATCH_SIZE))
+            chunk = output.getvalue()
+            if not chunk:
+                break
+            yield chunk
+            output.seek(0)
+            output.truncate()
+
+    response = Response(stream_with_context(generate()), mimetype="text/csv")
+    response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    return response
+
+
+BACKUP_BATCH_SIZE = 1000
+
+
+def _json_default(value):
+    """isoformat() for the datetimes in backup rows"""
+    return value.isoformat()
+
+
+if orjson is not None:
+    # Serialises datetimes to the same ISO strings natively
+    dump_json = orjson.dumps
+else:
+    def dump_json(value):
+        """UTF-8 JSON bytes, as orjson.dumps() would return them"""
+        return json.dumps(value, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def _json_document_pieces(sections):
+    """The JSON bytes of stream_json_document(), one small piece at a time"""
+    yield b"{"
+    for index, (key, value) in enumerate(sections):
+        yield (b"," if index else b"") + b"\n  " + dump_json(key) + b": "
+        if isinstance(value, Select):
+            yield b"["
+            separator = b"\n    "
+            rows = db.session.execute(
+                value.execution_options(yield_per=BACKUP_BATCH_SIZE))
+            for row in rows:
+                yield separator + dump_json(row._asdict())
+                separator = b",\n    "
+            yield b"\n  ]"
+        else:
+            yield dump_json(value)
+    yield b"\n}\n"
+
+
+def stream_json_document(sections):
+    """Yield a JSON object in STREAM_CHUNK_SIZE pieces.
+
+    sections is a sequence of (key, value) pairs. A column select() is
+    executed and written as an array of row objects fetched
+    BACKUP_BATCH_SIZE at a time, so a backup never holds a whole table in
+    memory; any other value is dumped as is.
+    """
+    buffer, size = [], 0
+    for piece in _json_document_pieces(sections):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    yield b"".join(buffer)
+
+
+def json_backup_response(sections):
+    """Stream sections as a dated JSON backup download"""
+    response = Response(
+        stream_with_context(stream_json_document(sections)),
+        mimetype="application/json")
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    return response
+
+
+# Long-lived servers rebuild the admin backup as a gzipped file in the
+# background every BACKUP_INTERVAL seconds (0 disables), and the download
+# route sends that file
+BACKUP_INTERVAL = float(os.getenv("BACKUP_INTERVAL", str(24 * 3600)))
+BACKUP_RETRY_DELAY = 300
+_backup_wakeup = threading.Event()
+_backup_writer = None
+
+
+def admin_backup_sections():
+    """Sections of the admin JSON backup"""
+    settings = get_cached_settings()
+    return (
+        ("customers", select(
+            Customer.id, Customer.name, Customer.gst_number,
+            Customer.phone, Customer.address)),
+        ("vehicles", select(
+            Vehicle.id, Vehicle.vehicle_number, Vehicle.vehicle_type,
+            Vehicle.customer_id)),
+        ("invoices", select(
+            Invoice.id, Invoice.bill_no, Invoice.date, Invoice.customer_id,
+            Invoice.vehicle_id, Invoice.grand_total,
+            Invoice.delivery_location, Invoice.has_waybill)),
+        ("users", select(
+            User.id, User.username, User.email, User.name,
+            User.role, User.status)),
+        ("settings", {"company_name_tamil": settings.company_name_tamil,
+                      "company_name_english": settings.company_name_english,
+                      "gstin": settings.gstin,
+                      }),
+        ("backup_date", datetime.now().isoformat()),
+    )
+
+
+def backup_artifact_path(app):
+    """Where the background writer keeps the latest admin backup"""
+    return os.path.join(app.instance_path, "backups", "backup_latest.json.gz")
+
+
+def backup_artifact_age(path):
+    """Seconds since the backup file was written, or None when there is none"""
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def write_backup_artifact(path, max_age=None):
+    """Write the admin backup to path as gzipped JSON, replacing the old
+    file only once the new one is complete.
+
+    Every worker runs a backup writer, so the write holds an exclusive lock
+    on path + ".lock". A worker that waited for the lock skips the write
+    when the file is now younger than max_age (None always writes).
+
+    Returns:
+        bool: True when this call wrote the file
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        age = backup_artifact_age(path)
+        if max_age is not None and age is not None and age < max_age:
+            return False
+        fd, partial = tempfile.mkstemp(dir=directory, suffix=".partial")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as out:
+                for chunk in stream_json_document(admin_backup_sections()):
+                    out.write(chunk)
+            os.replace(partial, path)
+        except BaseException:
+            os.remove(partial)
+            raise
+    return True
+
+
+def start_backup_writer(app):
+    """Keep the admin backup file fresh from a daemon thread.
+
+    The file is rebuilt once it is BACKUP_INTERVAL seconds old, or straight
+    away when an admin asks for a refresh (_backup_wakeup). Each worker
+    runs one, and the file lock in write_backup_artifact() means only one
+    of them writes per interval. Serverless
+    deployments can't keep the thread alive, so there backups are streamed
+    on request instead.
+    """
+    global _backup_writer
+    if _backup_writer is not None or BACKUP_INTERVAL <= 0:
+        return
+    path = backup_artifact_path(app)
+
+    def run():
+        while True:
+            age = backup_artifact_age(path)
+            due_in = 0 if age is None else BACKUP_INTERVAL - age
+            refresh = _backup_wakeup.wait(max(due_in, 0))
+            _backup_wakeup.clear()
+            try:
+                with app.app_context():
+                    # A scheduled run skips the write when another worker
+                    # has just written the file; a refresh always writes
+                    write_backup_artifact(
+                        path, max_age=None if refresh else BACKUP_INTERVAL)
+            except Exception as e:
+                logger.warning("Error writing backup: %s", e)
+                _backup_wakeup.wait(BACKUP_RETRY_DELAY)
+
+    _backup_writer = threading.Thread(target=run, name="backup-writer", daemon=True)
+    _backup_writer.start()
+
+
+# ------------------------------------------------------------
+# Invoice PDF rendering
+# ------------------------------------------------------------
+# Fixed layout, built once at import instead of on every request
+PDF_LEFT = 60
+PDF_RULE_RIGHT = 500
+PDF_TOTALS_X = 300
+PDF_ITEM_COLUMNS = (
+    (60, "பொருள் / Item"),
+    (200, "அளவு / Qty"),
+    (280, "விலை / Rate"),
+    (360, "தொகை / Amount"),
+)
+PDF_FOOTER_TEXT = "அங்கீகரிக்கப்பட்டவர் – ஸ்ரீ தனலட்சுமி புளு மெட்டல்ஸ்"
+PDF_SIGNATURE_LINES = ("__________________________", "Authorized Signature")
+PDF_CACHE_SIZE = 64
+PDF_FONT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "static", "fonts", "NotoSansTamil-Regular.ttf")
+
+
+@lru_cache(maxsize=1)
+def get_pdf_font():
+    """Register the Tamil TTF with reportlab on first use and return the font to draw with.
+
+    reportlab is imported here rather than at module level so cold starts
+    (notably on Vercel) only pay for it when a PDF is actually rendered.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if not os.path.exists(PDF_FONT_PATH):
+        logger.warning("⚠️ Tamil font missing at static/fonts/NotoSansTamil-Regular.ttf")
+        return "Helvetica"
+    try:
+        pdfmetrics.registerFont(TTFont("TamilFont", PDF_FONT_PATH))
+        logger.info("✅ Tamil font registered successfully")
+        return "TamilFont"
+    except Exception as err:
+        logger.warning("⚠️ Tamil font registration failed: %s", err)
+        return "Helvetica"
+
+# Rendered PDF bytes keyed by (invoice id, PDF ETag). The ETag covers the
+# bill number and total as well as the settings timestamp, so a new bill
+# that reuses a deleted bill's id never gets the old bill's PDF.
+_pdf_cache = OrderedDict()
+# Guards the LRU bookkeeping when workers run several threads; rendering
+# itself happens outside the lock
+_pdf_cache_lock = threading.Lock()
+
+
+def build_invoice_pdf(invoice, settings):
+    """Render an invoice to PDF bytes, reusing a cached copy when possible"""
+    cache_key = (invoice.id, invoice_etag(invoice, settings, "pdf"))
+    with _pdf_cache_lock:
+        cached = _pdf_cache.get(cache_key)
+        if cached is not None:
+            _pdf_cache.move_to_end(cache_key)
+            return cached
+
+    if PDF_ENGINE == "weasyprint" and HTML is not None:
+        pdf_bytes = render_invoice_pdf_html(invoice, settings)
+    else:
+        pdf_bytes = render_invoice_pdf_canvas(invoice, settings)
+
+    with _pdf_cache_lock:
+        _pdf_cache[cache_key] = pdf_bytes
+        if len(_pdf_cache) > PDF_CACHE_SIZE:
+            _pdf_cache.popitem(last=False)
+    return pdf_bytes
+
+
+def invalidate_invoice_pdf(invoice_id):
+    """Drop a deleted invoice's cached PDFs"""
+    with _pdf_cache_lock:
+        for cache_key in [key for key in _pdf_cache if key[0] == invoice_id]:
+            del _pdf_cache[cache_key]
+
+
+def render_invoice_pdf_html(invoice, settings):
+    """Render an invoice through the HTML template - table layout happens in WeasyPrint"""
+    html = render_template("invoice_pdf.html", invoice=invoice, settings=settings)
+    return HTML(string=html, base_url=request.url_root).write_pdf()
+
+
+def render_invoice_pdf_canvas(invoice, settings):
+    """Draw an invoice line by line on a reportlab canvas"""
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
+    # No output file: the finished document is taken straight from the
+    # canvas as bytes, skipping the copy into (and back out of) a BytesIO
+    c = canvas.Canvas(None, pagesize=A4)
+
+    # Use Tamil font if available - resolved once per process
+    font_name = get_pdf_font()
+
+    y = 800
+    # Company header
+    c.setFont(font_name, 18)
+    c.drawString(PDF_LEFT, y, settings.company_name_tamil)
+    y -= 25
+    c.setFont("Helvetica", 14)
+    c.drawString(PDF_LEFT, y, settings.company_name_english)
+    y -= 20
+
+    # Address
+    c.setFont(font_name, 10)
+    for line in settings.address_tamil.split("\n"):
+        c.drawString(PDF_LEFT, y, line)
+        y -= 15
+
+    # GSTIN and Phone
+    c.setFont("Helvetica", 10)
+    c.drawString(
+        PDF_LEFT, y, f"GSTIN: {settings.gstin} | Phone: {settings.phone_numbers}")
+    y -= 30
+
+    # Bill details
+    c.setFont(font_name, 12)
+    c.drawString(PDF_LEFT, y, f"பில் எண் / Bill No: {invoice.bill_no}")
+    y -= 20
+    c.drawString(
+        PDF_LEFT, y, f"தேதி / Date: {invoice.date.strftime('%d-%m-%Y')}")
+    y -= 20
+    c.drawString(PDF_LEFT, y, f"இடம் / From: {invoice.from_location}")
+    y -= 30
+
+    # Customer details
+    c.drawString(
+        PDF_LEFT, y, f"வாடிக்கையாளர் / Customer: {invoice.customer.name}")
+    y -= 20
+    if invoice.customer.gst_number:
+        c.drawString(PDF_LEFT, y, f"GST No: {invoice.customer.gst_number}")
+        y -= 20
+    c.drawString(
+        PDF_LEFT, y, f"வாகன எண் / Vehicle: {invoice.vehicle.vehicle_number if invoice.vehicle else 'N/A'}")
+    y -= 20
+    if invoice.delivery_location:
+        c.drawString(
+            PDF_LEFT, y, f"விநியோக இடம் / Delivery Location: {invoice.delivery_location}")
+        y -= 20
+    y -= 10
+
+    # Items table header
+    c.setFont(font_name, 11)
+    for x, label in PDF_ITEM_COLUMNS:
+        c.drawString(x, y, label)
+    y -= 20
+    c.line(PDF_LEFT, y, PDF_RULE_RIGHT, y)
+    y -= 15
+
+    # Items - formatters and drawString bound once for the row loop
+    c.setFont("Helvetica", 10)
+    draw = c.drawString
+    fmt_qty = "{:.2f}".format
+    fmt_money = "₹{:.2f}".format
+    for item in invoice.items:
+        draw(60, y, item.item_name)
+        draw(200, y, fmt_qty(item.quantity))
+        draw(280, y, fmt_money(item.rate))
+        draw(360, y, fmt_money(item.amount))
+        y -= 20
+
+    y -= 10
+    c.line(PDF_LEFT, y, PDF_RULE_RIGHT, y)
+    y -= 20
+
+    # Totals
+    c.setFont(font_name, 11)
+    c.drawString(PDF_TOTALS_X, y, f"Subtotal: ₹{invoice.subtotal:.2f}")
+    y -= 20
+    c.drawString(
+        PDF_TOTALS_X, y, f"CGST {settings.cgst_percent}%: ₹{invoice.cgst:.2f}")
+    y -= 20
+    c.drawString(
+        PDF_TOTALS_X, y, f"SGST {settings.sgst_percent}%: ₹{invoice.sgst:.2f}")
+    y -= 20
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(PDF_TOTALS_X, y, f"Grand Total: ₹{invoice.grand_total:.2f}")
+    y -= 40
+
+    # Waybill information if exists
+    if invoice.has_waybill and invoice.waybill:
+        waybill = invoice.waybill
+        y -= 20
+        c.line(PDF_LEFT, y, PDF_RULE_RIGHT, y)
+        y -= 20
+        c.setFont(font_name, 12)
+        c.drawString(PDF_LEFT, y, "வேய்பில் தகவல் / Waybill Information:")
+        y -= 20
+        c.setFont("Helvetica", 10)
+        if waybill.driver_name:
+            c.drawString(
+                PDF_LEFT, y, f"Driver Name / ஓட்டுநர் பெயர்: {waybill.driver_name}")
+            y -= 15
+        if waybill.material_type:
+            c.drawString(
+                PDF_LEFT, y, f"Material Type / பொருள் வகை: {waybill.material_type}")
+            y -= 15
+        if waybill.loading_time:
+            c.drawString(
+                PDF_LEFT, y, f"Loading Time / ஏற்ற நேரம்: {waybill.loading_time.strftime('%d-%m-%Y %H:%M')}")
+            y -= 15
+        if waybill.unloading_time:
+            c.drawString(
+                PDF_LEFT, y, f"Unloading Time / இறக்கும் நேரம்: {waybill.unloading_time.strftime('%d-%m-%Y %H:%M')}")
+            y -= 15
+            # Calculate and display duration
+            if waybill.loading_time:
+                duration = waybill.unloading_time - waybill.loading_time
+                hours = duration.total_seconds() / 3600
+                if hours >= 1:
+                    duration_str = f"{hours:.1f} hours"
+                else:
+                    minutes = duration.total_seconds() / 60
+                    duration_str = f"{minutes:.0f} minutes"
+                c.drawString(PDF_LEFT, y, f"Duration / காலம்: {duration_str}")
+                y -= 15
+        if waybill.vehicle_capacity:
+            c.drawString(
+                PDF_LEFT, y, f"Vehicle Capacity / வாகன திறன்: {waybill.vehicle_capacity}")
+            y -= 15
+        if waybill.delivery_location:
+            c.drawString(
+                PDF_LEFT, y, f"Delivery Location / விநியோக இடம்: {waybill.delivery_location}")
+            y -= 15
+        y -= 10
+
+    # Footer with signature block
+    y -= 20
+    c.setFont(font_name, 10)
+    c.drawString(PDF_LEFT, y, PDF_FOOTER_TEXT)
+    y -= 30
+
+    # Signature area - one text object for both lines
+    text = c.beginText(PDF_LEFT, y)
+    text.setFont("Helvetica", 10, leading=15)
+    text.textLines(PDF_SIGNATURE_LINES)
+    c.drawText(text)
+
+    c.showPage()
+    return c.getpdfdata()
+
+
 # ------------------------------------------------------------
 # Database initialisation
 # ------------------------------------------------------------
+# Set once init_db() succeeds so requests never repeat it
+_db_initialized = False
+
+
 def init_db():
     """Create tables and seed default data if needed.
     Note: For production, use Alembic migrations instead of db.create_all()
     """
+    global _db_initialized
     if not is_database_ready():
         return False
     try:
         # Only create tables if they don't exist (for initial setup)
         # In production, use: alembic upgrade head
         db.create_all()
+        setup_invoice_search()
+        backfill_daily_totals()
 
         # Create default admin user
         admin = User.query.filter_by(username="admin").first()
@@ -384,7 +1553,7 @@ def init_db():
                 username="admin",
                 email="admin@nrd",
                 name="Administrator",
-                password_hash=generate_password_hash("nrd"),
+                password_hash=hash_password("nrd"),
                 role="admin",
                 status="active"
             )
@@ -402,15 +1571,19 @@ def init_db():
                 {"name": "பவுடர்", "rate": 3000.0},
                 {"name": "மிக்சிங்", "rate": 3000.0},
             ]
-            for item_data in default_items:
-                item = Item(name=item_data["name"], rate=item_data["rate"])
-                db.session.add(item)
+            db.session.execute(insert(Item), default_items)
             db.session.commit()
             print("✅ Default items created")
 
+        # Seed the bill number counter from existing bills
+        if not db.session.get(Counter, "invoice"):
+            db.session.add(Counter(name="invoice", value=get_last_bill_number()))
+            db.session.commit()
+
         # Create default settings
         get_settings()
         print("✅ Database initialized successfully")
+        _db_initialized = True
         return True
     except Exception as err:
         print("⚠️ DB initialization error:", err)
@@ -422,34 +1595,46 @@ def init_db():
 # ------------------------------------------------------------
 # Routes - Registration function (called from create_app)
 # ------------------------------------------------------------
+# Endpoints served without the database checks in ensure_database()
+DB_FREE_ENDPOINTS = frozenset({"static", "ping"})
+
+
 def register_routes(app):
     """Register all routes with the Flask app"""
 
     @app.before_request
     def ensure_database():
         """Ensure database connection is ready"""
+        # Health checks and static files never touch the database
+        if request.endpoint in DB_FREE_ENDPOINTS or request.path.startswith("/static"):
+            return
+
         if not is_database_ready():
-            endpoint = request.endpoint or ""
-            if endpoint in {
-                "static",
-                "ping"} or request.path.startswith("/static"):
-                return
             # Show readable error instead of redirecting to setup
             return render_template(
                 "error.html",
                 error="Database connection not configured. Please set DATABASE_URL environment variable."
             ), 500
 
-        # Test database connection
+        # Initialized once in create_app(); after that the pool's pre-ping
+        # covers dropped connections, so requests go straight to work. Only
+        # when the database was unreachable at startup is it tested and
+        # initialized here.
+        if _db_initialized:
+            return
         try:
             db.session.execute(db.text("SELECT 1"))
         except Exception as e:
             return render_template(
                 "error.html", error=f"Database connection failed: {str(e)}. Please check your DATABASE_URL."), 500
+        init_db()
 
-        if not getattr(g, "_db_initialized", False):
-            init_db()
-            g._db_initialized = True
+    @app.teardown_request
+    def write_audit_log(exc):
+        """Persist audit events queued while handling the request, unless
+        the background writer is running"""
+        if _audit_writer is None and _audit_queue and is_database_ready():
+            flush_audit_queue()
 
     # ------------------------------------------------------------
     # Routes - Authentication
@@ -461,29 +1646,38 @@ def register_routes(app):
         return redirect(url_for("login"))
 
     @app.route("/login", methods=["GET", "POST"])
+    # Only failed attempts count - a successful login answers with a redirect
+    @limiter.limit(LOGIN_RATE_LIMIT, key_func=login_rate_key, methods=["POST"],
+                   deduct_when=lambda response: response.status_code != 302)
     def login():
         if current_user.is_authenticated:
             return redirect(url_for("dashboard"))
 
-            if request.method == "POST":
-                username = request.form.get("username", "").strip()
-                password = request.form.get("password", "").strip()
-                user = User.query.filter_by(username=username).first()
+        if request.method == "POST":
+            username = request.form.get("username", "").strip()
+            password = request.form.get("password", "").strip()
+            user = db.session.execute(
+                LOGIN_USER_STMT, {"username": username}).scalar_one_or_none()
 
-                if user and user.check_password(password):
-                    if user.status != "active":
-                        return render_template(
+            if user and user.check_password(password):
+                if user.status != "active":
+                    return render_template(
                         "login.html", error="Your account is inactive. Please contact administrator.")
-                        user.last_login = datetime.utcnow()
-                        db.session.commit()
-                        login_user(user)
-                        log_audit("login", ip_address=request.remote_addr)
-                        return redirect(url_for("dashboard"))
+                # last_login is only kept to the hour, so repeat logins
+                # skip the UPDATE unless the password hash was upgraded
+                now = datetime.utcnow()
+                if user.last_login is None or now - user.last_login > LAST_LOGIN_RESOLUTION:
+                    user.last_login = now
+                if db.session.is_modified(user):
+                    db.session.commit()
+                login_user(user)
+                log_audit("login", ip_address=request.remote_addr)
+                return redirect(url_for("dashboard"))
 
-                        return render_template("login.html",
+            return render_template("login.html",
                                    error="தவறான பயனர் பெயர் அல்லது கடவுச்சொல்")
 
-                        return render_template("login.html")
+        return render_template("login.html")
 
     @app.route("/logout")
     def logout():
@@ -499,40 +1693,55 @@ def register_routes(app):
     @app.route("/dashboard")
     @login_required
     def dashboard():
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        month_start = datetime.now().replace(
-            day=1, hour=0, minute=0, second=0, microsecond=0)
-
         # Get filtered invoice query based on user role
         invoice_query = get_user_invoices_query()
 
-        # Summary statistics
-        today_invoices = invoice_query.filter(Invoice.date >= today).all()
-        today_total = sum(inv.grand_total for inv in today_invoices)
-        today_count = len(today_invoices)
+        # Summary statistics - read from the daily totals, shared by users
+        # who see the same invoices
+        stats = get_dashboard_stats(get_invoice_scope())
 
-        monthly_invoices = invoice_query.filter(
-            Invoice.date >= month_start).all()
-        monthly_total = sum(inv.grand_total for inv in monthly_invoices)
-
-        # Customer count - only for admin/staff
+        # Customer count - only for admin/staff, cached with the totals
         if current_user.role in ["admin", "staff"]:
-            customer_count = Customer.query.count()
+            customer_count = stats["customer_count"]
         else:
             customer_count = 1 if current_user.customer_id else 0
 
-        # Recent invoices
-        recent_invoices = invoice_query.order_by(
-            desc(Invoice.created_at)).limit(10).all()
+        # Recent invoices - plain rows with just the columns the dashboard
+        # table shows, customer and vehicle joined in the same query
+        recent_invoices = (
+            invoice_query
+            .join(Customer, Invoice.customer_id == Customer.id)
+            .outerjoin(Vehicle, Invoice.vehicle_id == Vehicle.id)
+            .with_entities(
+                Invoice.id,
+                Invoice.bill_no,
+                Invoice.date,
+                Invoice.grand_total,
+                Customer.name.label("customer_name"),
+                Vehicle.vehicle_number)
+            .order_by(desc(Invoice.created_at))
+            .limit(10)
+            .all()
+        )
 
         # Recent customers - only for admin/staff
         if current_user.role in ["admin", "staff"]:
-            recent_customers = (
-                db.session.query(Customer)
-                .join(Invoice)
-                .order_by(desc(Invoice.created_at))
-                .distinct()
+            # Latest bill per customer, aggregated over invoices alone; only
+            # the five winners are joined back to customers
+            last_billed = (
+                db.session.query(
+                    Invoice.customer_id,
+                    func.max(Invoice.created_at).label("last_billed_at"))
+                .group_by(Invoice.customer_id)
+                .order_by(desc("last_billed_at"))
                 .limit(5)
+                .subquery()
+            )
+            recent_customers = (
+                Customer.query
+                .options(load_only(Customer.name, Customer.phone))
+                .join(last_billed, Customer.id == last_billed.c.customer_id)
+                .order_by(desc(last_billed.c.last_billed_at))
                 .all()
             )
         else:
@@ -545,9 +1754,9 @@ def register_routes(app):
 
         return render_template(
             "dashboard.html",
-            today_count=today_count,
-            today_total=today_total,
-            monthly_total=monthly_total,
+            today_count=stats["today_count"],
+            today_total=stats["today_total"],
+            monthly_total=stats["monthly_total"],
             customer_count=customer_count,
             recent_invoices=recent_invoices,
             recent_customers=recent_customers,
@@ -564,32 +1773,42 @@ def register_routes(app):
         if not query:
             return redirect(url_for("dashboard"))
 
-            # Get filtered invoice query based on user role
-            invoice_query = get_user_invoices_query()
-
-            # Search invoices by customer name, vehicle, or bill number
-            invoices = (
-            invoice_query.join(Customer)
+        # Get filtered invoice query based on user role
+        invoice_query = (
+            get_user_invoices_query()
+            .join(Customer)
             .outerjoin(Vehicle)
-            .filter(
+            .options(
+                INVOICE_ROW_COLUMNS,
+                contains_eager(Invoice.customer).load_only(
+                    Customer.name, raiseload=STRICT_ROW_LOADING),
+                contains_eager(Invoice.vehicle).load_only(
+                    Vehicle.vehicle_number, raiseload=STRICT_ROW_LOADING),
+                *STRICT_ROW_OPTIONS)
+        )
+
+        # Search invoices by customer name, vehicle, or bill number
+        matching_ids = search_invoice_ids(query)
+        if matching_ids is not None:
+            invoice_query = invoice_query.filter(Invoice.id.in_(matching_ids))
+        else:
+            invoice_query = invoice_query.filter(
                 db.or_(
                     Customer.name.ilike(f"%{query}%"),
                     Invoice.bill_no.ilike(f"%{query}%"),
                     Vehicle.vehicle_number.ilike(f"%{query}%"),
                 )
             )
-            .order_by(desc(Invoice.created_at))
-            .all()
-            )
+        invoices = invoice_query.order_by(desc(Invoice.created_at)).all()
 
-            return render_template(
+        return render_template(
             "search_results.html",
             invoices=invoices,
             query=query)
 
-            # ------------------------------------------------------------
-            # Routes - Customers
-            # ------------------------------------------------------------
+    # ------------------------------------------------------------
+    # Routes - Customers
+    # ------------------------------------------------------------
 
     @app.route("/customers")
     @login_required
@@ -617,6 +1836,7 @@ def register_routes(app):
             )
             db.session.add(customer)
             db.session.commit()
+            invalidate_dashboard_cache()
             flash("Customer added successfully", "success")
         except Exception as e:
             db.session.rollback()
@@ -647,11 +1867,13 @@ def register_routes(app):
             customer = Customer.query.get_or_404(customer_id)
             db.session.delete(customer)
             db.session.commit()
+            invalidate_dashboard_cache()
+            invalidate_report_cache()
             flash("Customer deleted successfully", "success")
         except Exception as e:
-                db.session.rollback()
-                flash(f"Error deleting customer: {str(e)}", "danger")
-                return redirect(url_for("customers"))
+            db.session.rollback()
+            flash(f"Error deleting customer: {str(e)}", "danger")
+        return redirect(url_for("customers"))
 
     @app.route("/customers/<int:customer_id>")
     @login_required
@@ -661,26 +1883,30 @@ def register_routes(app):
         if current_user.role == "user" and current_user.customer_id != customer_id:
             flash("Access denied", "danger")
             return redirect(url_for("dashboard"))
-            invoices = Invoice.query.filter_by(
+        invoices = Invoice.query.options(*INVOICE_ROW_OPTIONS).filter_by(
             customer_id=customer_id).order_by(
             desc(
                 Invoice.created_at)).all()
-            return render_template(
+        return render_template(
             "customer_detail.html",
             customer=customer,
             invoices=invoices)
 
-            # ------------------------------------------------------------
-            # Routes - API for autocomplete
-            # ------------------------------------------------------------
+    # ------------------------------------------------------------
+    # Routes - API for autocomplete
+    # ------------------------------------------------------------
 
     @app.route("/api/customers")
     @login_required
     def api_customers():
         query = request.args.get("q", "").strip()
-        customers = Customer.query.filter(
-            Customer.name.ilike(
-                f"%{query}%")).limit(10).all()
+        # Plain rows with just the fields the autocomplete fills in
+        customers = db.session.execute(
+            select(Customer.id, Customer.name, Customer.gst_number,
+                   Customer.phone, Customer.address)
+            .where(Customer.name.ilike(f"%{query}%"))
+            .limit(10)
+        ).all()
         return jsonify([{"id": c.id,
                          "name": c.name,
                          "gst_number": c.gst_number or "",
@@ -692,32 +1918,32 @@ def register_routes(app):
     def api_vehicles():
         query = request.args.get("q", "").strip().upper()
         customer_id = request.args.get("customer_id", type=int)
+        matching = (
+            select(Vehicle.id, Vehicle.vehicle_number, Vehicle.vehicle_type)
+            .where(Vehicle.vehicle_number.ilike(f"%{query}%"))
+            .limit(10)
+        )
 
         # If customer_id provided, prioritize vehicles for that customer
         if customer_id:
-            vehicles = Vehicle.query.filter(
-            Vehicle.vehicle_number.ilike(f"%{query}%"),
-            Vehicle.customer_id == customer_id
-            ).order_by(desc(Vehicle.created_at)).limit(10).all()
+            vehicles = db.session.execute(
+                matching.where(Vehicle.customer_id == customer_id)
+                .order_by(desc(Vehicle.created_at))
+            ).all()
             # If no matches for customer, fall back to all vehicles
             if not vehicles:
-                vehicles = Vehicle.query.filter(
-                Vehicle.vehicle_number.ilike(
-                    f"%{query}%")).limit(10).all()
-            else:
-                    vehicles = Vehicle.query.filter(
-                    Vehicle.vehicle_number.ilike(
-                    f"%{query}%")).order_by(
-                    desc(
-                    Vehicle.created_at)).limit(10).all()
+                vehicles = db.session.execute(matching).all()
+        else:
+            vehicles = db.session.execute(
+                matching.order_by(desc(Vehicle.created_at))).all()
 
-                    return jsonify([{"id": v.id,
+        return jsonify([{"id": v.id,
                          "vehicle_number": v.vehicle_number,
                          "vehicle_type": v.vehicle_type or ""} for v in vehicles])
 
-                    # ------------------------------------------------------------
-                    # Routes - Create Bill
-                    # ------------------------------------------------------------
+    # ------------------------------------------------------------
+    # Routes - Create Bill
+    # ------------------------------------------------------------
 
     @app.route("/create_bill", methods=["GET", "POST"])
     @staff_required
@@ -725,256 +1951,230 @@ def register_routes(app):
         try:
             if request.method == "POST":
                 try:
-                    # Get form data
-                    customer_name = request.form.get("customer_name", "").strip()
-                    vehicle_number = request.form.get(
-                    "vehicle_number", "").strip().upper()
-                    bill_date = request.form.get(
-                    "date", datetime.now().strftime("%Y-%m-%d"))
+                    # Get form data - required text fields in one pass
+                    form = request.form
+                    customer_name, vehicle_number, driver_name = (
+                        form.get(key, "").strip() for key in
+                        ("customer_name", "vehicle_number", "driver_name"))
+                    vehicle_number = vehicle_number.upper()
+                    bill_date = form.get(
+                        "date", datetime.now().strftime("%Y-%m-%d"))
 
                     if not customer_name:
-                        flash("Customer name is required", "danger")
-                        items = Item.query.filter_by(is_active=True).all() or []
-                        items_data = [{"id": item.id, "name": item.name,
-                                   "rate": float(item.rate)} for item in items]
-                        return render_template(
-                        "create_bill.html", items=items, items_data=items_data)
-
-                        if not vehicle_number:
-                            flash("Vehicle number is required", "danger")
-                            items = Item.query.filter_by(is_active=True).all() or []
-                            items_data = [{"id": item.id, "name": item.name,
-                                   "rate": float(item.rate)} for item in items]
-                            return render_template(
-                            "create_bill.html", items=items, items_data=items_data)
-
-                            # Validate vehicle format - Allow TN32AX3344, TN10AA9988, etc.
-                            import re
-                            # Pattern: 2 letters, 2 digits, 1-2 letters, 4 digits
-                            if not re.match(
-                                r"^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$",
-                                vehicle_number):
+                        error = "Customer name is required"
+                    elif not vehicle_number:
+                        error = "Vehicle number is required"
+                    elif not VEHICLE_NUMBER_RE.match(vehicle_number):
+                        error = "Invalid vehicle number format. Expected format: TN32AX3344 or TN10AA9988"
+                    elif not driver_name:
+                        error = "Driver name is required for waybill"
+                    else:
+                        error = None
+                    if error:
+                        flash(error, "danger")
+                        return render_bill_form()
+
+                    # Process items - validated before anything is added to
+                    # the session so a rejected bill needs no rollback
+                    item_names = request.form.getlist("item_name[]")
+                    quantities = request.form.getlist("quantity[]")
+                    rates = request.form.getlist("rate[]")
+
+                    subtotal = 0.0
+                    invoice_items = []
+                    add_item = invoice_items.append
+                    for i, (item_name, quantity, rate) in enumerate(
+                            zip(item_names, quantities, rates)):
+                        if item_name and quantity and rate:
+                            try:
+                                qty = float(quantity)
+                                rate = float(rate)
+                                amount = qty * rate
+                                subtotal += amount
+
+                                add_item({
+                                    "item_name": item_name,
+                                    "quantity": qty,
+                                    "rate": rate,
+                                    "amount": amount,
+                                })
+                            except (ValueError, TypeError) as e:
+                                logger.warning("Error processing item %d: %s", i, e)
+                                continue
+
+                    if subtotal == 0:
+                        flash(
+                            "At least one item with quantity and rate is required",
+                            "danger")
+                        return render_bill_form()
+
+                    # All lookups run before anything is written; the bill
+                    # is committed once at the end
+                    customer = Customer.query.filter_by(name=customer_name).first()
+                    vehicle = Vehicle.query.filter_by(
+                        vehicle_number=vehicle_number).first()
+                    settings = get_cached_settings()
+                    bill_no = get_next_bill_no()
+
+                    # Get or create customer
+                    if not customer:
+                        customer = Customer(
+                            name=customer_name, gst_number=request.form.get(
+                                "customer_gst", "").strip() or None, phone=request.form.get(
+                                "customer_phone", "").strip() or None, address=request.form.get(
+                                "customer_address", "").strip() or None, )
+
+                    # Get or create vehicle
+                    if not vehicle:
+                        vehicle = Vehicle(
+                            vehicle_number=vehicle_number,
+                            vehicle_type=request.form.get(
+                                "vehicle_type",
+                                "").strip() or None,
+                            customer=customer,
+                        )
+
+                    # New customers/vehicles are the only ORM objects; flush
+                    # them for their ids (a no-op when both already exist)
+                    db.session.add_all([customer, vehicle])
+                    db.session.flush()
+
+                    # Calculate GST
+                    cgst_rate, sgst_rate = get_gst_rates(settings)
+                    cgst = subtotal * cgst_rate
+                    sgst = subtotal * sgst_rate
+                    grand_total = subtotal + cgst + sgst
+
+                    # Create invoice - a Core INSERT, no ORM object is built
+                    # for a row this request only writes
+                    delivery_location = request.form.get(
+                        "delivery_location", "").strip() or None
+                    has_waybill = True
+
+                    invoice_values = dict(
+                        bill_no=bill_no,
+                        date=datetime.fromisoformat(bill_date),
+                        customer_id=customer.id,
+                        vehicle_id=vehicle.id,
+                        user_id=current_user.id,
+                        from_location=settings.from_location,
+                        delivery_location=delivery_location,
+                        has_waybill=has_waybill,
+                        subtotal=subtotal,
+                        cgst=cgst,
+                        sgst=sgst,
+                        grand_total=grand_total,
+                    )
+                    invoice_id = db.session.execute(
+                        insert(Invoice).values(**invoice_values)
+                        .returning(Invoice.id)
+                    ).scalar_one()
+                    update_daily_totals(invoice_values)
+
+                    for row in invoice_items:
+                        row["invoice_id"] = invoice_id
+                    db.session.execute(insert(InvoiceItem), invoice_items)
+
+                    material_type = request.form.get(
+                        "material_type", "").strip() or None
+                    vehicle_capacity = request.form.get(
+                        "vehicle_capacity", "").strip() or None
+
+                    # Calculate loading and unloading times
+                    loading_time = datetime.now()
+                    delivery_duration = request.form.get(
+                        "delivery_duration", "").strip()
+                    duration_unit = request.form.get(
+                        "duration_unit", "hours").strip()
+
+                    unloading_time = loading_time
+                    if delivery_duration:
+                        try:
+                            duration = float(delivery_duration)
+                            if duration_unit == "hours":
+                                unloading_time = loading_time + \
+                                    timedelta(hours=duration)
+                            else:
+                                unloading_time = loading_time + \
+                                    timedelta(minutes=duration)
+                        except (ValueError, TypeError):
+                            unloading_time = loading_time + timedelta(hours=2)
+                    else:
+                        unloading_time = loading_time + timedelta(hours=2)
+
+                    db.session.execute(insert(Waybill).values(
+                        invoice_id=invoice_id,
+                        driver_name=driver_name,
+                        loading_time=loading_time,
+                        unloading_time=unloading_time,
+                        material_type=material_type,
+                        vehicle_capacity=vehicle_capacity,
+                        delivery_location=delivery_location,
+                    ))
+                    db.session.commit()
+                    invalidate_dashboard_cache()
+                    invalidate_report_cache()
+                    log_audit(
+                        "create_bill",
+                        "invoice",
+                        invoice_id,
+                        f"Bill {bill_no} created",
+                        request.remote_addr)
+
+                    # Auto-send SMS/WhatsApp notifications if enabled
+                    try:
+                        settings_obj = get_cached_settings()
+                        base_url = request.url_root.rstrip('/')
+                        if not (settings_obj.auto_send_sms or settings_obj.auto_send_whatsapp):
+                            flash("Bill created successfully!", "success")
+                        elif queue_invoice_notification(invoice_id, base_url):
+                            flash(
+                                "Bill created successfully! Notifications are being sent.", "success")
+                        else:
+                            invoice = db.session.get(Invoice, invoice_id)
+                            notification_results = send_invoice_notification(
+                                settings_obj, invoice, base_url)
+
+                            if settings_obj.auto_send_sms and notification_results.get(
+                                    "sms", {}).get("success"):
                                 flash(
-                                "Invalid vehicle number format. Expected format: TN32AX3344 or TN10AA9988",
-                                "danger")
-                                items = Item.query.filter_by(is_active=True).all() or []
-                                items_data = [{"id": item.id, "name": item.name,
-                                   "rate": float(item.rate)} for item in items]
-                                return render_template(
-                                "create_bill.html", items=items, items_data=items_data)
-
-                                # Get or create customer
-                                customer = Customer.query.filter_by(name=customer_name).first()
-                                if not customer:
-                                    customer = Customer(
-                                    name=customer_name, gst_number=request.form.get(
-                                    "customer_gst", "").strip() or None, phone=request.form.get(
-                                    "customer_phone", "").strip() or None, address=request.form.get(
-                                    "customer_address", "").strip() or None, )
-                                    db.session.add(customer)
-                                    db.session.flush()
-
-                                    # Get or create vehicle
-                                    vehicle = Vehicle.query.filter_by(
-                                    vehicle_number=vehicle_number).first()
-                                    if not vehicle:
-                                        vehicle = Vehicle(
-                                        vehicle_number=vehicle_number,
-                                        vehicle_type=request.form.get(
-                                        "vehicle_type",
-                                        "").strip() or None,
-                                        customer_id=customer.id,
-                                        )
-                                        db.session.add(vehicle)
-                                        db.session.flush()
-
-                                        # Create invoice
-                                        settings = get_settings()
-                                        bill_no = get_next_bill_no()
-                                        delivery_location = request.form.get(
-                                        "delivery_location", "").strip() or None
-                                        has_waybill = True
-
-                                        invoice = Invoice(
-                                        bill_no=bill_no,
-                                        date=datetime.strptime(bill_date, "%Y-%m-%d"),
-                                        customer_id=customer.id,
-                                        vehicle_id=vehicle.id,
-                                        user_id=current_user.id,
-                                        from_location=settings.from_location,
-                                        delivery_location=delivery_location,
-                                        has_waybill=has_waybill,
-                                        )
-                                        db.session.add(invoice)
-                                        db.session.flush()
-
-                                        # Create waybill if requested
-                                        driver_name = request.form.get(
-                                        "driver_name", "").strip() or None
-                                        if not driver_name:
-                                            db.session.rollback()
-                                            flash("Driver name is required for waybill", "danger")
-                                            items = Item.query.filter_by(is_active=True).all() or []
-                                            items_data = [{"id": item.id, "name": item.name,
-                                            "rate": float(item.rate)} for item in items]
-                                            return render_template(
-                                            "create_bill.html", items=items, items_data=items_data)
-
-                                            material_type = request.form.get(
-                                            "material_type", "").strip() or None
-                                            vehicle_capacity = request.form.get(
-                                            "vehicle_capacity", "").strip() or None
-
-                                            # Calculate loading and unloading times
-                                            loading_time = datetime.now()
-                                            delivery_duration = request.form.get(
-                                            "delivery_duration", "").strip()
-                                            duration_unit = request.form.get(
-                                            "duration_unit", "hours").strip()
-
-                                            unloading_time = loading_time
-                                            if delivery_duration:
-                                                try:
-                                                    duration = float(delivery_duration)
-                                                    if duration_unit == "hours":
-                                                        unloading_time = loading_time + \
-                                                            timedelta(hours=duration)
-                                                    else:
-                                                        unloading_time = loading_time + \
-                                                            timedelta(minutes=duration)
-                                                except (ValueError, TypeError):
-                                                    unloading_time = loading_time + timedelta(hours=2)
-                                            else:
-                                                unloading_time = loading_time + timedelta(hours=2)
-
-                                            waybill = Waybill(
-                                                invoice_id=invoice.id,
-                                                driver_name=driver_name,
-                                                loading_time=loading_time,
-                                                unloading_time=unloading_time,
-                                                material_type=material_type,
-                                                vehicle_capacity=vehicle_capacity,
-                                                delivery_location=delivery_location,
-                                            )
-                                            db.session.add(waybill)
-
-                                            # Process items
-                                            item_names = request.form.getlist("item_name[]")
-                                            quantities = request.form.getlist("quantity[]")
-                                            rates = request.form.getlist("rate[]")
-
-                                            subtotal = 0.0
-                                            for i in range(len(item_names)):
-                                                if item_names[i] and quantities[i] and rates[i]:
-                                                    try:
-                                                        qty = float(quantities[i])
-                                                        rate = float(rates[i])
-                                                        amount = qty * rate
-                                                        subtotal += amount
-
-                                                        invoice_item = InvoiceItem(
-                                                            invoice_id=invoice.id,
-                                                            item_name=item_names[i],
-                                                            quantity=qty,
-                                                            rate=rate,
-                                                            amount=amount,
-                                                        )
-                                                        db.session.add(invoice_item)
-                                                    except (ValueError, TypeError) as e:
-                                                                            print(f"Error processing item {i}: {e}")
-                                                                            continue
-
-                                                                            if subtotal == 0:
-                                                                                db.session.rollback()
-                                                                                flash(
-                                                                                "At least one item with quantity and rate is required",
-                                                                                "danger")
-                                                                                items = Item.query.filter_by(is_active=True).all() or []
-                                                                                items_data = [{"id": item.id, "name": item.name,
-                                                                                "rate": float(item.rate)} for item in items]
-                                                                                return render_template(
-                                                                                "create_bill.html", items=items, items_data=items_data)
-
-                                                                                # Calculate GST
-                                                                                cgst = subtotal * (settings.cgst_percent / 100)
-                                                                                sgst = subtotal * (settings.sgst_percent / 100)
-                                                                                grand_total = subtotal + cgst + sgst
-
-                                                                                invoice.subtotal = subtotal
-                                                                                invoice.cgst = cgst
-                                                                                invoice.sgst = sgst
-                                                                                invoice.grand_total = grand_total
-
-                                                                                db.session.commit()
-                                                                                log_audit(
-                                                                                "create_bill",
-                                                                                "invoice",
-                                                                                invoice.id,
-                                                                                f"Bill {
-                                                                                invoice.bill_no} created",
-                                                                                request.remote_addr)
-
-                                                                                # Auto-send SMS/WhatsApp notifications if enabled
-                                                                                try:
-                                                                                    settings_obj = get_settings()
-                                                                                    if settings_obj.auto_send_sms or settings_obj.auto_send_whatsapp:
-                                                                                        base_url = request.url_root.rstrip('/')
-                                                                                        notification_results = send_invoice_notification(
-                                                                                        settings_obj, invoice, base_url)
-
-                                                                                        if settings_obj.auto_send_sms and notification_results.get(
-                                                                                            "sms", {}).get("success"):
-                                                                                            flash(
-                                                                                                "Bill created and SMS sent successfully!", "success")
-                                                                                        elif settings_obj.auto_send_whatsapp and notification_results.get("whatsapp", {}).get("success"):
-                                                                                            flash(
-                                                                                                "Bill created and WhatsApp sent successfully!", "success")
-                                                                                        else:
-                                                                                            flash("Bill created successfully!", "success")
-                                                                                    else:
-                                                                                        flash("Bill created successfully!", "success")
-                                                                                except Exception as e:
-                                                                                                            print(f"⚠️ Error sending notifications: {e}")
-                                                                                                            flash(
-                                                                                                            "Bill created successfully! (Notification sending failed)",
-                                                                                                            "success")
-
-                                                                                                            return redirect(
-                                                                                                            url_for(
-                                                                                                            "invoice_detail",
-                                                                                                            invoice_id=invoice.id))
+                                    "Bill created and SMS sent successfully!", "success")
+                            elif settings_obj.auto_send_whatsapp and notification_results.get("whatsapp", {}).get("success"):
+                                flash(
+                                    "Bill created and WhatsApp sent successfully!", "success")
+                            else:
+                                flash("Bill created successfully!", "success")
+                    except Exception as e:
+                        logger.warning("⚠️ Error sending notifications: %s", e)
+                        flash(
+                            "Bill created successfully! (Notification sending failed)",
+                            "success")
+
+                    return redirect(
+                        url_for(
+                            "invoice_detail",
+                            invoice_id=invoice_id))
 
                 except Exception as e:
                     db.session.rollback()
                     flash(f"Error creating bill: {str(e)}", "danger")
-                    import traceback
-                    traceback.print_exc()
-                    items = Item.query.filter_by(is_active=True).all() or []
-                    items_data = [{"id": item.id, "name": item.name,
-                                   "rate": float(item.rate)} for item in items]
-                    return render_template(
-                        "create_bill.html",
-                        items=items,
-                        items_data=items_data)
+                    logger.exception("⚠️ Error creating bill")
+                    return render_bill_form()
 
             # GET request - show form
             try:
-                items = Item.query.filter_by(is_active=True).all()
-                # Convert to list of dicts for JSON serialization
-                items_data = [{"id": item.id, "name": item.name,
-                               "rate": float(item.rate)} for item in items]
+                # Plain dicts - usable by the template and JSON serialization
+                items_data = get_active_items()
             except Exception as e:
-                print(f"Error fetching items: {e}")
-                items = []
+                logger.warning("Error fetching items: %s", e)
                 items_data = []
 
             return render_template(
                 "create_bill.html",
-                items=items,
+                items=items_data,
                 items_data=items_data)
         except Exception as e:
-            import traceback
-            traceback.print_exc()
+            logger.exception("⚠️ Error loading create bill page")
             flash(f"Error loading create bill page: {str(e)}", "danger")
             return redirect(url_for("dashboard"))
 
@@ -985,267 +2185,149 @@ def register_routes(app):
     @app.route("/invoice/<int:invoice_id>")
     @login_required
     def invoice_detail(invoice_id):
-        invoice = Invoice.query.get_or_404(invoice_id)
+        invoice = get_invoice_or_404(invoice_id)
         # Check access - users can only see their own invoices
         if current_user.role == "user" and current_user.customer_id != invoice.customer_id:
             flash("Access denied", "danger")
             return redirect(url_for("dashboard"))
-            settings = get_settings()
-            return render_template(
+        settings = get_cached_settings()
+
+        # The page shows role-specific actions and any pending flash
+        # messages, so only revalidate when nothing is waiting to be shown
+        etag = invoice_etag(invoice, settings, current_user.role)
+        if "_flashes" not in session and request.if_none_match.contains(etag):
+            return not_modified(etag)
+
+        response = make_response(render_template(
             "invoice_detail.html",
             invoice=invoice,
-            settings=settings)
+            settings=settings))
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
 
     @app.route("/invoice/<int:invoice_id>/pdf")
     @login_required
     def invoice_pdf(invoice_id):
-        invoice = Invoice.query.get_or_404(invoice_id)
+        invoice = get_invoice_or_404(invoice_id)
         # Check access - users can only see their own invoices
         if current_user.role == "user" and current_user.customer_id != invoice.customer_id:
             flash("Access denied", "danger")
             return redirect(url_for("dashboard"))
-            settings = get_settings()
-
-            buffer = io.BytesIO()
-            c = canvas.Canvas(buffer, pagesize=A4)
-
-            # Use Tamil font if available
-            font_name = "TamilFont" if "TamilFont" in pdfmetrics.getRegisteredFontNames() else "Helvetica"
-            c.setFont(font_name, 16)
-
-            y = 800
-            # Company header
-            c.setFont(font_name, 18)
-            c.drawString(60, y, settings.company_name_tamil)
-            y -= 25
-            c.setFont("Helvetica", 14)
-            c.drawString(60, y, settings.company_name_english)
-            y -= 20
-
-            # Address
-            c.setFont(font_name, 10)
-            for line in settings.address_tamil.split("\n"):
-                c.drawString(60, y, line)
-                y -= 15
-
-                # GSTIN and Phone
-                c.setFont("Helvetica", 10)
-                c.drawString(
-                60, y, f"GSTIN: {
-                settings.gstin} | Phone: {
-                settings.phone_numbers}")
-                y -= 30
-
-                # Bill details
-                c.setFont(font_name, 12)
-                c.drawString(60, y, f"பில் எண் / Bill No: {invoice.bill_no}")
-                y -= 20
-                c.drawString(
-                60, y, f"தேதி / Date: {invoice.date.strftime('%d-%m-%Y')}")
-                y -= 20
-                c.drawString(60, y, f"இடம் / From: {invoice.from_location}")
-                y -= 30
-
-                # Customer details
-                c.drawString(
-                60, y, f"வாடிக்கையாளர் / Customer: {invoice.customer.name}")
-                y -= 20
-                if invoice.customer.gst_number:
-                    c.drawString(60, y, f"GST No: {invoice.customer.gst_number}")
-                    y -= 20
-                    c.drawString(
-                    60, y, f"வாகன எண் / Vehicle: {invoice.vehicle.vehicle_number if invoice.vehicle else 'N/A'}")
-                    y -= 20
-                    if invoice.delivery_location:
-                        c.drawString(
-                        60, y, f"விநியோக இடம் / Delivery Location: {invoice.delivery_location}")
-                        y -= 20
-                        y -= 10
-
-                        # Items table header
-                        c.setFont(font_name, 11)
-                        c.drawString(60, y, "பொருள் / Item")
-                        c.drawString(200, y, "அளவு / Qty")
-                        c.drawString(280, y, "விலை / Rate")
-                        c.drawString(360, y, "தொகை / Amount")
-                        y -= 20
-                        c.line(60, y, 500, y)
-                        y -= 15
-
-                        # Items
-                        c.setFont("Helvetica", 10)
-                        for item in invoice.items:
-                            c.drawString(60, y, item.item_name)
-                            c.drawString(200, y, f"{item.quantity:.2f}")
-                            c.drawString(280, y, f"₹{item.rate:.2f}")
-                            c.drawString(360, y, f"₹{item.amount:.2f}")
-                            y -= 20
-
-                            y -= 10
-                            c.line(60, y, 500, y)
-                            y -= 20
-
-                            # Totals
-                            c.setFont(font_name, 11)
-                            c.drawString(300, y, f"Subtotal: ₹{invoice.subtotal:.2f}")
-                            y -= 20
-                            c.drawString(
-                            300, y, f"CGST {
-                            settings.cgst_percent}%: ₹{
-                            invoice.cgst:.2f}")
-                            y -= 20
-                            c.drawString(
-                            300, y, f"SGST {
-                            settings.sgst_percent}%: ₹{
-                            invoice.sgst:.2f}")
-                            y -= 20
-                            c.setFont("Helvetica-Bold", 14)
-                            c.drawString(300, y, f"Grand Total: ₹{invoice.grand_total:.2f}")
-                            y -= 40
-
-                            # Waybill information if exists
-                            if invoice.has_waybill and invoice.waybill:
-                                y -= 20
-                                c.line(60, y, 500, y)
-                                y -= 20
-                                c.setFont(font_name, 12)
-                                c.drawString(60, y, "வேய்பில் தகவல் / Waybill Information:")
-                                y -= 20
-                                c.setFont("Helvetica", 10)
-                                if invoice.waybill.driver_name:
-                                    c.drawString(
-                                    60, y, f"Driver Name / ஓட்டுநர் பெயர்: {invoice.waybill.driver_name}")
-                                    y -= 15
-                                    if invoice.waybill.material_type:
-                                        c.drawString(
-                                        60, y, f"Material Type / பொருள் வகை: {invoice.waybill.material_type}")
-                                        y -= 15
-                                        if invoice.waybill.loading_time:
-                                            c.drawString(
-                                            60, y, f"Loading Time / ஏற்ற நேரம்: {
-                                            invoice.waybill.loading_time.strftime('%d-%m-%Y %H:%M')}")
-                                            y -= 15
-                                            if invoice.waybill.unloading_time:
-                                                c.drawString(
-                                                60, y, f"Unloading Time / இறக்கும் நேரம்: {
-                                                invoice.waybill.unloading_time.strftime('%d-%m-%Y %H:%M')}")
-                                                y -= 15
-                                                # Calculate and display duration
-                                                if invoice.waybill.loading_time:
-                                                    duration = invoice.waybill.unloading_time - invoice.waybill.loading_time
-                                                    hours = duration.total_seconds() / 3600
-                                                    if hours >= 1:
-                                                        duration_str = f"{hours:.1f} hours"
-                                                    else:
-                                                            minutes = duration.total_seconds() / 60
-                                                            duration_str = f"{minutes:.0f} minutes"
-                                                            c.drawString(60, y, f"Duration / காலம்: {duration_str}")
-                                                            y -= 15
-                                                            if invoice.waybill.vehicle_capacity:
-                                                                c.drawString(
-                                                                60, y, f"Vehicle Capacity / வாகன திறன்: {invoice.waybill.vehicle_capacity}")
-                                                                y -= 15
-                                                                if invoice.waybill.delivery_location:
-                                                                    c.drawString(
-                                                                    60, y, f"Delivery Location / விநியோக இடம்: {invoice.waybill.delivery_location}")
-                                                                    y -= 15
-                                                                    y -= 10
-
-                                                                    # Footer with signature block
-                                                                    y -= 20
-                                                                    c.setFont(font_name, 10)
-                                                                    c.drawString(
-                                                                    60, y, "அங்கீகரிக்கப்பட்டவர் – ஸ்ரீ தனலட்சுமி புளு மெட்டல்ஸ்")
-                                                                    y -= 30
-
-                                                                    # Signature area
-                                                                    c.setFont("Helvetica", 10)
-                                                                    c.drawString(60, y, "__________________________")
-                                                                    y -= 15
-                                                                    c.drawString(60, y, "Authorized Signature")
-
-                                                                    c.showPage()
-                                                                    c.save()
-                                                                    buffer.seek(0)
-
-                                                                    return send_file(
-                                                                    buffer,
-                                                                    download_name=f"invoice_{invoice.bill_no}.pdf",
-                                                                    as_attachment=True,
-                                                                    mimetype="application/pdf",
-                                                                    )
+        settings = get_cached_settings()
+
+        etag = invoice_etag(invoice, settings, "pdf")
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+
+        pdf_bytes = build_invoice_pdf(invoice, settings)
+
+        # The rendered bytes are already in memory (and cached), so hand them
+        # to the response as-is rather than re-reading them through a file.
+        response = make_response(pdf_bytes)
+        response.mimetype = "application/pdf"
+        response.headers["Content-Disposition"] = (
+            f"attachment; filename=invoice_{invoice.bill_no}.pdf")
+        response.set_etag(etag)
+        # Revalidated on every download, so a settings change or a reused
+        # invoice id shows up at once; a matching ETag costs only a 304
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
 
     @app.route("/invoice/<int:invoice_id>/duplicate", methods=["POST"])
     @staff_required
     def duplicate_invoice(invoice_id):
         try:
-            original = Invoice.query.get_or_404(invoice_id)
+            original = get_invoice_or_404(invoice_id)
             bill_no = get_next_bill_no()
 
-            new_invoice = Invoice(
-            bill_no=bill_no,
-            date=datetime.now(),
-            customer_id=original.customer_id,
-            vehicle_id=original.vehicle_id,
-            user_id=current_user.id,
-            subtotal=original.subtotal,
-            cgst=original.cgst,
-            sgst=original.sgst,
-            grand_total=original.grand_total,
-            from_location=original.from_location,
+            invoice_values = dict(
+                bill_no=bill_no,
+                date=datetime.now(),
+                customer_id=original.customer_id,
+                vehicle_id=original.vehicle_id,
+                user_id=current_user.id,
+                subtotal=original.subtotal,
+                cgst=original.cgst,
+                sgst=original.sgst,
+                grand_total=original.grand_total,
+                from_location=original.from_location,
             )
-            db.session.add(new_invoice)
-            db.session.flush()
-
-            for item in original.items:
-                new_item = InvoiceItem(
-                invoice_id=new_invoice.id,
-                item_name=item.item_name,
-                quantity=item.quantity,
-                rate=item.rate,
-                amount=item.amount,
-                )
-                db.session.add(new_item)
+            new_invoice_id = db.session.execute(
+                insert(Invoice).values(**invoice_values).returning(Invoice.id)
+            ).scalar_one()
+            update_daily_totals(invoice_values)
+
+            # All lines in one executemany
+            if original.items:
+                db.session.execute(insert(InvoiceItem), [{
+                    "invoice_id": new_invoice_id,
+                    "item_name": item.item_name,
+                    "quantity": item.quantity,
+                    "rate": item.rate,
+                    "amount": item.amount,
+                } for item in original.items])
 
-                db.session.commit()
-                log_audit(
+            db.session.commit()
+            invalidate_dashboard_cache()
+            invalidate_report_cache()
+            log_audit(
                 "duplicate_bill",
                 "invoice",
-                new_invoice.id,
-                f"Bill {
-                new_invoice.bill_no} duplicated from {
-                original.bill_no}",
+                new_invoice_id,
+                f"Bill {bill_no} duplicated from {original.bill_no}",
                 request.remote_addr)
-                flash("Invoice duplicated successfully", "success")
-                return redirect(url_for("invoice_detail", invoice_id=new_invoice.id))
+            flash("Invoice duplicated successfully", "success")
+            return redirect(url_for("invoice_detail", invoice_id=new_invoice_id))
         except Exception as e:
-                    db.session.rollback()
-                    flash(f"Error duplicating invoice: {str(e)}", "danger")
-                    return redirect(url_for("dashboard"))
+            db.session.rollback()
+            flash(f"Error duplicating invoice: {str(e)}", "danger")
+            return redirect(url_for("dashboard"))
 
     @app.route("/invoice/<int:invoice_id>/delete", methods=["POST"])
     @staff_required
     def delete_invoice(invoice_id):
+        # Items and waybill are removed by id, so nothing is loaded just to
+        # be deleted
         try:
-            invoice = Invoice.query.get_or_404(invoice_id)
-            bill_no = invoice.bill_no
-            db.session.delete(invoice)
+            db.session.execute(
+                delete(InvoiceItem).where(InvoiceItem.invoice_id == invoice_id))
+            db.session.execute(
+                delete(Waybill).where(Waybill.invoice_id == invoice_id))
+            deleted = db.session.execute(
+                delete(Invoice).where(Invoice.id == invoice_id)
+                .returning(Invoice.bill_no, Invoice.customer_id, Invoice.date,
+                           *(getattr(Invoice, name) for name in DAILY_TOTAL_AMOUNTS))
+            ).first()
+            if deleted is None:
+                abort(404)
+            bill_no = deleted.bill_no
+            update_daily_totals(deleted._mapping, sign=-1)
             db.session.commit()
+            invalidate_dashboard_cache()
+            invalidate_report_cache()
+            invalidate_invoice_pdf(invoice_id)
             log_audit(
-            "delete_bill",
-            "invoice",
-            invoice_id,
-            f"Bill {bill_no} deleted",
-            request.remote_addr)
+                "delete_bill",
+                "invoice",
+                invoice_id,
+                f"Bill {bill_no} deleted",
+                request.remote_addr)
             flash("Invoice deleted successfully", "success")
+        except HTTPException:
+            # The 404 for a missing invoice must reach the client
+            db.session.rollback()
+            raise
         except Exception as e:
-                db.session.rollback()
-                flash(f"Error deleting invoice: {str(e)}", "danger")
-                return redirect(url_for("dashboard"))
+            db.session.rollback()
+            flash(f"Error deleting invoice: {str(e)}", "danger")
+        return redirect(url_for("dashboard"))
 
-                # ------------------------------------------------------------
-                # Routes - Reports
-                # ------------------------------------------------------------
+    # ------------------------------------------------------------
+    # Routes - Reports
+    # ------------------------------------------------------------
 
     @app.route("/reports")
     @login_required
@@ -1254,257 +2336,259 @@ def register_routes(app):
 
     @app.route("/reports/daily")
     @login_required
+    @read_only
     def daily_report():
         date_str = request.args.get(
             "date", datetime.now().strftime("%Y-%m-%d"))
         try:
-            report_date = datetime.strptime(date_str, "%Y-%m-%d")
-            start = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end = report_date.replace(
+            report_date = datetime.fromisoformat(date_str)
+        except ValueError:
+            flash("Invalid date format", "danger")
+            return redirect(url_for("reports"))
+        start = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = report_date.replace(
             hour=23,
             minute=59,
             second=59,
             microsecond=999999)
 
-            # Get filtered invoice query based on user role
-            invoice_query = get_user_invoices_query()
-            invoices = invoice_query.filter(
+        # Get filtered invoice query based on user role
+        invoice_query = get_user_invoices_query()
+        invoices = invoice_query.options(*INVOICE_ROW_OPTIONS).filter(
             Invoice.date >= start,
             Invoice.date <= end).order_by(
             Invoice.date).all()
-            total_amount = sum(inv.grand_total for inv in invoices)
+        total_amount = sum(inv.grand_total for inv in invoices)
 
-            return render_template(
+        return render_template(
             "daily_report.html",
             invoices=invoices,
             date=report_date,
             total_amount=total_amount,
             count=len(invoices))
-        except BaseException:
-                flash("Invalid date format", "danger")
-                return redirect(url_for("reports"))
 
     @app.route("/reports/weekly")
     @login_required
+    @read_only
     def weekly_report():
         week_str = request.args.get("week", "")
         try:
-            if week_str:
-                # Handle ISO week format: YYYY-Www
-                if "-W" in week_str:
-                    year, week = map(int, week_str.split("-W"))
-                    # Calculate start of week (Monday)
-                    jan1 = datetime(year, 1, 1)
-                    days_offset = (week - 1) * 7
-                    start = jan1 + timedelta(days=days_offset - jan1.weekday())
-                else:
-                    # Handle HTML5 week input format: YYYY-Www
-                    parts = week_str.split("-W")
-                    if len(parts) == 2:
-                        year, week = int(parts[0]), int(parts[1])
-                        jan1 = datetime(year, 1, 1)
-                        days_offset = (week - 1) * 7
-                        start = jan1 + timedelta(days=days_offset - jan1.weekday())
-                    else:
-                        raise ValueError("Invalid week format")
-                start = start.replace(hour=0, minute=0, second=0, microsecond=0)
-                end = start + timedelta(days=6, hours=23, minutes=59, seconds=59)
-            else:
-                # Default to current week
-                today = datetime.now()
-                start = today - timedelta(days=today.weekday())
-                start = start.replace(hour=0, minute=0, second=0, microsecond=0)
-                end = start + timedelta(days=6, hours=23, minutes=59, seconds=59)
+            # ISO / HTML5 week input format: YYYY-Www; default to this week
+            start, end = (get_week_range(week_str) if week_str
+                          else get_current_week_range())
+        except (ValueError, OverflowError) as e:
+            flash(f"Invalid week format: {str(e)}", "danger")
+            return redirect(url_for("reports"))
 
-            # Get filtered invoice query based on user role
-            invoice_query = get_user_invoices_query()
-            invoices = invoice_query.filter(
-                Invoice.date >= start,
-                Invoice.date <= end).order_by(
-                Invoice.date).all()
-            total_amount = sum(inv.grand_total for inv in invoices)
+        # Get filtered invoice query based on user role
+        invoice_query = get_user_invoices_query()
+        invoices = invoice_query.options(*INVOICE_ROW_OPTIONS).filter(
+            Invoice.date >= start,
+            Invoice.date <= end).order_by(
+            Invoice.date).all()
+        total_amount = sum(inv.grand_total for inv in invoices)
 
-            return render_template(
-                "weekly_report.html",
-                invoices=invoices,
-                                    start_date=start,
-                                    end_date=end,
-                                    total_amount=total_amount,
-                                    count=len(invoices))
-        except Exception as e:
-                                        flash(f"Invalid week format: {str(e)}", "danger")
-                                        return redirect(url_for("reports"))
+        return render_template(
+            "weekly_report.html",
+            invoices=invoices,
+            start_date=start,
+            end_date=end,
+            total_amount=total_amount,
+            count=len(invoices))
 
     @app.route("/reports/monthly")
     @login_required
+    @read_only
     def monthly_report():
         month_str = request.args.get("month", datetime.now().strftime("%Y-%m"))
         try:
-            year, month = map(int, month_str.split("-"))
-            start = datetime(year, month, 1)
-            if month == 12:
-                end = datetime(year + 1, 1, 1) - timedelta(seconds=1)
-            else:
-                    end = datetime(year, month + 1, 1) - timedelta(seconds=1)
-
-                    # Get filtered invoice query based on user role
-                    invoice_query = get_user_invoices_query()
-                    invoices = invoice_query.filter(
-                    Invoice.date >= start,
-                    Invoice.date <= end).order_by(
-                    Invoice.date).all()
-
-                    # Group by week
-                    weekly_data = {}
-                    for inv in invoices:
-                        week_num = (inv.date.day - 1) // 7 + 1
-                        if week_num not in weekly_data:
-                            weekly_data[week_num] = []
-                            weekly_data[week_num].append(inv)
-
-                            weekly_totals = {
-                            week: sum(
-                            inv.grand_total for inv in invs) for week,
-                            invs in weekly_data.items()}
-                            monthly_total = sum(inv.grand_total for inv in invoices)
-
-                            return render_template(
-                            "monthly_report.html",
-                            invoices=invoices,
-                            month=start,
-                            weekly_totals=weekly_totals,
-                            monthly_total=monthly_total)
-        except BaseException:
-                                flash("Invalid month format", "danger")
-                                return redirect(url_for("reports"))
+            start, end = get_month_range(month_str)
+        except ValueError:
+            flash("Invalid month format", "danger")
+            return redirect(url_for("reports"))
+
+        # Get filtered invoice query based on user role
+        month_query = get_user_invoices_query().filter(
+            Invoice.date >= start,
+            Invoice.date <= end)
+        pagination = month_query.options(*INVOICE_ROW_OPTIONS).order_by(
+            Invoice.date).paginate(
+            page=request.args.get("page", 1, type=int),
+            per_page=REPORT_PAGE_SIZE,
+            error_out=False)
+
+        # Week of the month (days 1-7 are week 1, ...) summed in SQL over
+        # the month's daily totals
+        scope = get_invoice_scope()
+        week_num = (cast(extract("day", InvoiceDailyTotal.day), db.Integer) - 1) // 7 + 1
+        weekly_totals = get_report_totals(
+            "monthly", scope, start,
+            lambda: dict(get_daily_totals_query(scope).filter(
+                InvoiceDailyTotal.day >= start.date(),
+                InvoiceDailyTotal.day <= end.date()).with_entities(
+                week_num, func.sum(InvoiceDailyTotal.grand_total)
+            ).group_by(week_num).all()))
+        monthly_total = sum(weekly_totals.values())
+
+        return render_template(
+            "monthly_report.html",
+            invoices=pagination.items,
+            pagination=pagination,
+            month=start,
+            weekly_totals=weekly_totals,
+            monthly_total=monthly_total)
 
     @app.route("/reports/customer/<int:customer_id>")
     @login_required
+    @read_only
     def customer_report(customer_id):
-        customer = Customer.query.get_or_404(customer_id)
         # Check access - users can only see their own customer
         if current_user.role == "user" and current_user.customer_id != customer_id:
             flash("Access denied", "danger")
             return redirect(url_for("dashboard"))
-            invoices = Invoice.query.filter_by(
+        # The customer and their totals (from the daily totals) in one
+        # round trip
+        totals = (
+            select(
+                InvoiceDailyTotal.customer_id,
+                func.sum(InvoiceDailyTotal.grand_total).label("total"),
+                func.max(InvoiceDailyTotal.day).label("last_visit"))
+            .where(InvoiceDailyTotal.customer_id == customer_id)
+            .group_by(InvoiceDailyTotal.customer_id)
+            .subquery()
+        )
+        row = (
+            db.session.query(
+                Customer, func.coalesce(totals.c.total, 0.0), totals.c.last_visit)
+            .outerjoin(totals, totals.c.customer_id == Customer.id)
+            .filter(Customer.id == customer_id)
+            .first()
+        )
+        if row is None:
+            abort(404)
+        customer, total, last_visit = row
+        pagination = Invoice.query.options(*INVOICE_ROW_OPTIONS).filter_by(
             customer_id=customer_id).order_by(
             desc(
-                Invoice.date)).all()
-            total = sum(inv.grand_total for inv in invoices)
-            last_visit = invoices[0].date if invoices else None
+                Invoice.date)).paginate(
+            page=request.args.get("page", 1, type=int),
+            per_page=REPORT_PAGE_SIZE,
+            error_out=False)
 
-            return render_template(
+        return render_template(
             "customer_report.html",
             customer=customer,
-            invoices=invoices,
+            invoices=pagination.items,
+            pagination=pagination,
             total=total,
             last_visit=last_visit)
 
     @app.route("/reports/vehicle/<int:vehicle_id>")
     @login_required
+    @read_only
     def vehicle_report(vehicle_id):
-        vehicle = Vehicle.query.get_or_404(vehicle_id)
-        invoices = Invoice.query.filter_by(
+        # The vehicle and its total in one round trip
+        total = (
+            select(func.coalesce(func.sum(Invoice.grand_total), 0.0))
+            .where(Invoice.vehicle_id == Vehicle.id)
+            .scalar_subquery()
+        )
+        row = db.session.query(Vehicle, total).filter(Vehicle.id == vehicle_id).first()
+        if row is None:
+            abort(404)
+        vehicle, total = row
+        pagination = Invoice.query.options(*INVOICE_ROW_OPTIONS).filter_by(
             vehicle_id=vehicle_id).order_by(
             desc(
-                Invoice.date)).all()
-        total = sum(inv.grand_total for inv in invoices)
+                Invoice.date)).paginate(
+            page=request.args.get("page", 1, type=int),
+            per_page=REPORT_PAGE_SIZE,
+            error_out=False)
 
         return render_template(
             "vehicle_report.html",
             vehicle=vehicle,
-            invoices=invoices,
+            invoices=pagination.items,
+            pagination=pagination,
             total=total)
 
     @app.route("/reports/gst")
     @login_required
+    @read_only
     def gst_report():
         month_str = request.args.get("month", datetime.now().strftime("%Y-%m"))
         try:
-            year, month = map(int, month_str.split("-"))
-            start = datetime(year, month, 1)
-            if month == 12:
-                end = datetime(year + 1, 1, 1) - timedelta(seconds=1)
-            else:
-                    end = datetime(year, month + 1, 1) - timedelta(seconds=1)
+            start, end = get_month_range(month_str)
+        except ValueError:
+            flash("Invalid month format", "danger")
+            return redirect(url_for("reports"))
 
-                    # Get filtered invoice query based on user role
-                    invoice_query = get_user_invoices_query()
-                    invoices = invoice_query.filter(
-                    Invoice.date >= start,
-                    Invoice.date <= end).all()
-                    total_cgst = sum(inv.cgst for inv in invoices)
-                    total_sgst = sum(inv.sgst for inv in invoices)
-                    total_amount = sum(inv.grand_total for inv in invoices)
+        # Get filtered invoice query based on user role
+        month_query = get_user_invoices_query().filter(
+            Invoice.date >= start,
+            Invoice.date <= end)
+        invoices = month_query.options(
+            load_only(Invoice.bill_no, Invoice.date, Invoice.subtotal,
+                      Invoice.cgst, Invoice.sgst, Invoice.grand_total,
+                      Invoice.customer_id, raiseload=STRICT_ROW_LOADING),
+            joinedload(Invoice.customer).load_only(
+                Customer.name, raiseload=STRICT_ROW_LOADING),
+            *STRICT_ROW_OPTIONS,
+        ).order_by(Invoice.date).all()
+
+        # Tax totals in one aggregate query over the month's daily totals
+        scope = get_invoice_scope()
+        total_subtotal, total_cgst, total_sgst, total_amount = get_report_totals(
+            "gst", scope, start,
+            lambda: tuple(get_daily_totals_query(scope).filter(
+                InvoiceDailyTotal.day >= start.date(),
+                InvoiceDailyTotal.day <= end.date()).with_entities(
+                *(func.coalesce(func.sum(getattr(InvoiceDailyTotal, name)), 0.0)
+                  for name in DAILY_TOTAL_AMOUNTS)
+            ).one()))
 
-                    return render_template(
-                    "gst_report.html",
-                    invoices=invoices,
-                    month=start,
-                    total_cgst=total_cgst,
-                    total_sgst=total_sgst,
-                    total_amount=total_amount)
-        except BaseException:
-                        flash("Invalid month format", "danger")
-                        return redirect(url_for("reports"))
+        return render_template(
+            "gst_report.html",
+            invoices=invoices,
+            month=start,
+            total_subtotal=total_subtotal,
+            total_cgst=total_cgst,
+            total_sgst=total_sgst,
+            total_amount=total_amount)
 
-                        # ------------------------------------------------------------
-                        # Routes - Export Reports
-                        # ------------------------------------------------------------
+    # ------------------------------------------------------------
+    # Routes - Export Reports
+    # ------------------------------------------------------------
 
     @app.route("/reports/weekly/export")
     @login_required
+    @read_only
     def export_weekly_csv():
         week_str = request.args.get("week", "")
         try:
-            if week_str:
-                year, week = map(int, week_str.split("-W"))
-                jan1 = datetime(year, 1, 1)
-                days_offset = (week - 1) * 7
-                start = jan1 + timedelta(days=days_offset - jan1.weekday())
-                end = start + timedelta(days=6, hours=23, minutes=59, seconds=59)
-            else:
-                    today = datetime.now()
-                    start = today - timedelta(days=today.weekday())
-                    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
-                    end = start + timedelta(days=6, hours=23, minutes=59, seconds=59)
-
-                    # Get filtered invoice query based on user role
-                    invoice_query = get_user_invoices_query()
-                    invoices = invoice_query.filter(
-                    Invoice.date >= start,
-                    Invoice.date <= end).all()
-
-                    output = io.StringIO()
-                    writer = csv.writer(output)
-                    writer.writerow(["Bill No", "Customer", "Vehicle", "Date", "Amount"])
-                    for inv in invoices:
-                        writer.writerow([inv.bill_no,
-                             inv.customer.name,
-                             inv.vehicle.vehicle_number if inv.vehicle else "",
-                             inv.date.strftime("%Y-%m-%d"),
-                             inv.grand_total])
-
-                        output.seek(0)
-                        week_label = week_str if week_str else f"{
-                        start.strftime('%Y-%m-%d')}_to_{
-                        end.strftime('%Y-%m-%d')}"
-                        return send_file(
-                        io.BytesIO(output.getvalue().encode("utf-8-sig")),
-                        mimetype="text/csv",
-                        as_attachment=True,
-                        download_name=f"weekly_report_{week_label}.csv",
-                        )
+            start, end = (get_week_range(week_str) if week_str
+                          else get_current_week_range())
+
+            # Get filtered invoice query based on user role
+            invoice_query = get_user_invoices_query().filter(
+                Invoice.date >= start,
+                Invoice.date <= end)
+
+            week_label = week_str if week_str else (
+                f"{start.strftime('%Y-%m-%d')}_to_{end.strftime('%Y-%m-%d')}")
+            return invoice_csv_response(
+                invoice_query, f"weekly_report_{week_label}.csv")
         except Exception as e:
-                            flash(f"Error exporting report: {str(e)}", "danger")
-                            return redirect(url_for("reports"))
+            flash(f"Error exporting report: {str(e)}", "danger")
+            return redirect(url_for("reports"))
 
     @app.route("/reports/daily/export")
     @login_required
+    @read_only
     def export_daily_csv():
         date_str = request.args.get(
             "date", datetime.now().strftime("%Y-%m-%d"))
-        report_date = datetime.strptime(date_str, "%Y-%m-%d")
+        report_date = datetime.fromisoformat(date_str)
         start = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
         end = report_date.replace(
             hour=23,
@@ -1513,28 +2597,12 @@ def register_routes(app):
             microsecond=999999)
 
         # Get filtered invoice query based on user role
-        invoice_query = get_user_invoices_query()
-        invoices = invoice_query.filter(
+        invoice_query = get_user_invoices_query().filter(
             Invoice.date >= start,
-            Invoice.date <= end).all()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["Bill No", "Customer", "Vehicle", "Date", "Amount"])
-        for inv in invoices:
-            writer.writerow([inv.bill_no,
-                         inv.customer.name,
-                         inv.vehicle.vehicle_number if inv.vehicle else "",
-                         inv.date.strftime("%Y-%m-%d"),
-                         inv.grand_total])
+            Invoice.date <= end)
 
-            output.seek(0)
-            return send_file(
-            io.BytesIO(output.getvalue().encode("utf-8-sig")),
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name=f"daily_report_{date_str}.csv",
-            )
+        return invoice_csv_response(
+            invoice_query, f"daily_report_{date_str}.csv")
 
             # ------------------------------------------------------------
             # Routes - Settings
@@ -1564,47 +2632,22 @@ def register_routes(app):
                 settings_obj.from_location = request.form.get(
                 "from_location", "நெமிலி").strip()
                 settings_obj.updated_at = datetime.utcnow()
+                bump_version(SETTINGS_VERSION_COUNTER)
                 db.session.commit()
                 flash("Settings updated successfully", "success")
             except Exception as e:
-                    db.session.rollback()
-                    flash(f"Error updating settings: {str(e)}", "danger")
+                db.session.rollback()
+                flash(f"Error updating settings: {str(e)}", "danger")
 
-                    settings_obj = get_settings()
-                    return render_template("settings.html", settings=settings_obj)
+        # Saving posts every field back, so the form must show the current row
+        # rather than a cached copy that may predate another worker's save
+        return render_template("settings.html", settings=get_settings())
 
     @app.route("/backup")
     @admin_required
     def backup_database():
         """Export all data as JSON"""
-        data = {"customers": [{"id": c.id,
-                               "name": c.name,
-                               "gst_number": c.gst_number,
-                               "phone": c.phone,
-                               "address": c.address} for c in Customer.query.all()],
-                "vehicles": [{"id": v.id,
-                              "vehicle_number": v.vehicle_number,
-                              "vehicle_type": v.vehicle_type} for v in Vehicle.query.all()],
-                "invoices": [{"id": inv.id,
-                              "bill_no": inv.bill_no,
-                              "date": inv.date.isoformat(),
-                              "customer_id": inv.customer_id,
-                              "vehicle_id": inv.vehicle_id,
-                              "grand_total": inv.grand_total,
-                              } for inv in Invoice.query.all()],
-                }
-
-        return send_file(
-            io.BytesIO(
-                json.dumps(
-                    data,
-                    indent=2,
-                    ensure_ascii=False).encode("utf-8")),
-            mimetype="application/json",
-            as_attachment=True,
-            download_name=f"backup_{
-                datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-        )
+        return redirect(url_for("admin_backup"))
 
         # ------------------------------------------------------------
         # Routes - Items Management
@@ -1621,17 +2664,18 @@ def register_routes(app):
     def add_item():
         try:
             item = Item(
-            name=request.form.get("name", "").strip(),
-            rate=float(request.form.get("rate", 0)),
-            is_active=True,
+                name=request.form.get("name", "").strip(),
+                rate=float(request.form.get("rate", 0)),
+                is_active=True,
             )
             db.session.add(item)
+            bump_version(ITEMS_VERSION_COUNTER)
             db.session.commit()
             flash("Item added successfully", "success")
         except Exception as e:
-                db.session.rollback()
-                flash(f"Error adding item: {str(e)}", "danger")
-                return redirect(url_for("items"))
+            db.session.rollback()
+            flash(f"Error adding item: {str(e)}", "danger")
+        return redirect(url_for("items"))
 
     @app.route("/items/<int:item_id>/edit", methods=["POST"])
     @admin_required
@@ -1642,42 +2686,67 @@ def register_routes(app):
             item.rate = float(request.form.get("rate", 0))
             item.is_active = request.form.get("is_active") == "on"
             item.updated_at = datetime.utcnow()
+            bump_version(ITEMS_VERSION_COUNTER)
             db.session.commit()
             flash("Item updated successfully", "success")
+        except HTTPException:
+            # The 404 for a missing item must reach the client
+            db.session.rollback()
+            raise
         except Exception as e:
-                db.session.rollback()
-                flash(f"Error updating item: {str(e)}", "danger")
-                return redirect(url_for("items"))
+            db.session.rollback()
+            flash(f"Error updating item: {str(e)}", "danger")
+        return redirect(url_for("items"))
 
     @app.route("/items/<int:item_id>/toggle", methods=["POST"])
     @admin_required
     def toggle_item(item_id):
+        items_table = Item.__table__
         try:
-            item = Item.query.get_or_404(item_id)
-            item.is_active = not item.is_active
-            item.updated_at = datetime.utcnow()
+            # Flip the flag in a single UPDATE instead of loading the row first
+            row = db.session.execute(
+                items_table.update()
+                .where(items_table.c.id == item_id)
+                .values(is_active=~items_table.c.is_active,
+                        updated_at=datetime.utcnow())
+                .returning(items_table.c.is_active)
+            ).first()
+            if row is None:
+                abort(404)
+            bump_version(ITEMS_VERSION_COUNTER)
             db.session.commit()
             flash(
-            f"Item {
-                'activated' if item.is_active else 'deactivated'} successfully",
-            "success")
+                f"Item {'activated' if row.is_active else 'deactivated'} successfully",
+                "success")
+        except HTTPException:
+            # The 404 for a missing item must reach the client
+            db.session.rollback()
+            raise
         except Exception as e:
-                db.session.rollback()
-                flash(f"Error toggling item: {str(e)}", "danger")
-                return redirect(url_for("items"))
+            db.session.rollback()
+            flash(f"Error toggling item: {str(e)}", "danger")
+        return redirect(url_for("items"))
 
     @app.route("/items/<int:item_id>/delete", methods=["POST"])
     @admin_required
     def delete_item(item_id):
+        items_table = Item.__table__
         try:
-            item = Item.query.get_or_404(item_id)
-            db.session.delete(item)
+            result = db.session.execute(
+                items_table.delete().where(items_table.c.id == item_id))
+            if result.rowcount == 0:
+                abort(404)
+            bump_version(ITEMS_VERSION_COUNTER)
             db.session.commit()
             flash("Item deleted successfully", "success")
+        except HTTPException:
+            # The 404 for a missing item must reach the client
+            db.session.rollback()
+            raise
         except Exception as e:
-                db.session.rollback()
-                flash(f"Error deleting item: {str(e)}", "danger")
-                return redirect(url_for("items"))
+            db.session.rollback()
+            flash(f"Error deleting item: {str(e)}", "danger")
+        return redirect(url_for("items"))
 
                 # ------------------------------------------------------------
                 # Routes - Admin Panel
@@ -1691,12 +2760,28 @@ def register_routes(app):
     @app.route("/admin/users")
     @role_required("admin")
     def admin_users():
-        users = User.query.order_by(User.created_at.desc()).all()
-        customers = Customer.query.order_by(Customer.name).all()
+        # Keyset pagination - newest first, next page continues below after_id
+        after_id = request.args.get("after_id", type=int)
+        users_query = User.query.options(load_only(
+            User.id, User.username, User.email, User.name, User.role,
+            User.status, User.last_login, User.customer_id))
+        if after_id:
+            users_query = users_query.filter(User.id < after_id)
+        users = users_query.order_by(desc(User.id)).limit(ADMIN_PAGE_SIZE + 1).all()
+        next_after_id = None
+        if len(users) > ADMIN_PAGE_SIZE:
+            users = users[:ADMIN_PAGE_SIZE]
+            next_after_id = users[-1].id
+
+        # The customer pickers only need id and name
+        customers = db.session.execute(
+            select(Customer.id, Customer.name).order_by(Customer.name)).all()
         return render_template(
             "admin_users.html",
             users=users,
-            customers=customers)
+            customers=customers,
+            after_id=after_id,
+            next_after_id=next_after_id)
 
     @app.route("/admin/users/add", methods=["POST"])
     @role_required("admin")
@@ -1713,7 +2798,8 @@ def register_routes(app):
                 flash("Username and password are required", "danger")
                 return redirect(url_for("admin_users"))
 
-                if User.query.filter_by(username=username).first():
+                if db.session.execute(
+                        select(User.id).where(User.username == username)).first():
                     flash("Username already exists", "danger")
                     return redirect(url_for("admin_users"))
 
@@ -1721,7 +2807,7 @@ def register_routes(app):
                     username=username,
                     email=email or None,
                     name=name or None,
-                    password_hash=generate_password_hash(password),
+                    password_hash=hash_password(password),
                     role=role,
                     customer_id=customer_id,
                     status="active"
@@ -1753,7 +2839,7 @@ def register_routes(app):
 
             password = request.form.get("password", "").strip()
             if password:
-                user.password_hash = generate_password_hash(password)
+                user.password_hash = hash_password(password)
 
                 db.session.commit()
                 log_audit(
@@ -1854,21 +2940,21 @@ def register_routes(app):
                 settings.auto_send_whatsapp = request.form.get(
                 "auto_send_whatsapp") == "on"
 
+                bump_version(SETTINGS_VERSION_COUNTER)
                 db.session.commit()
                 flash("Messaging settings updated successfully", "success")
             except Exception as e:
-                    db.session.rollback()
-                    flash(f"Error updating settings: {str(e)}", "danger")
+                db.session.rollback()
+                flash(f"Error updating settings: {str(e)}", "danger")
 
-                    settings = get_settings()
-                    return render_template("admin_messaging.html", settings=settings)
+        return render_template("admin_messaging.html", settings=get_settings())
 
     @app.route("/admin/messaging/test-sms", methods=["POST"])
     @role_required("admin")
     def test_sms():
         """Send test SMS"""
         try:
-            settings = get_settings()
+            settings = get_cached_settings()
             test_number = request.form.get("test_number", "").strip()
 
             if not test_number:
@@ -1918,7 +3004,7 @@ def register_routes(app):
     def test_whatsapp():
         """Send test WhatsApp message"""
         try:
-            settings = get_settings()
+            settings = get_cached_settings()
             test_number = request.form.get("test_number", "").strip()
 
             if not test_number:
@@ -1967,58 +3053,74 @@ def register_routes(app):
     @role_required("admin")
     def admin_backup_page():
         """Backup/Restore page"""
-        return render_template("admin_backup.html")
+        latest_backup = None
+        if _backup_writer is not None:
+            try:
+                latest_backup = datetime.fromtimestamp(
+                    os.path.getmtime(backup_artifact_path(app)))
+            except OSError:
+                pass
+        return render_template(
+            "admin_backup.html",
+            sqlite_backup=bool(sqlite_database_path()),
+            background_backup=_backup_writer is not None,
+            latest_backup=latest_backup)
 
     @app.route("/admin/backup")
     @role_required("admin")
     def admin_backup():
         """Download database backup"""
+        if request.args.get("format") == "sqlite":
+            return admin_backup_sqlite()
+        # Send the file the background writer keeps, when it has one
+        if _backup_writer is not None:
+            path = backup_artifact_path(app)
+            try:
+                built = datetime.fromtimestamp(os.path.getmtime(path))
+                return send_file(
+                    path,
+                    mimetype="application/gzip",
+                    as_attachment=True,
+                    download_name=f"backup_{built.strftime('%Y%m%d_%H%M%S')}.json.gz",
+                )
+            except OSError:
+                pass
         try:
-            backup_data = {"customers": [{"id": c.id,
-                                      "name": c.name,
-                                      "gst_number": c.gst_number,
-                                      "phone": c.phone,
-                                      "address": c.address} for c in Customer.query.all()],
-                       "vehicles": [{"id": v.id,
-                                     "vehicle_number": v.vehicle_number,
-                                     "vehicle_type": v.vehicle_type,
-                                     "customer_id": v.customer_id} for v in Vehicle.query.all()],
-                       "invoices": [{"id": inv.id,
-                                     "bill_no": inv.bill_no,
-                                     "date": inv.date.isoformat(),
-                                     "customer_id": inv.customer_id,
-                                     "vehicle_id": inv.vehicle_id,
-                                     "grand_total": inv.grand_total,
-                                     "delivery_location": inv.delivery_location,
-                                     "has_waybill": inv.has_waybill,
-                                     } for inv in Invoice.query.all()],
-                       "users": [{"id": u.id,
-                                  "username": u.username,
-                                  "email": u.email,
-                                  "name": u.name,
-                                  "role": u.role,
-                                  "status": u.status} for u in User.query.all()],
-                       "settings": {"company_name_tamil": get_settings().company_name_tamil,
-                                    "company_name_english": get_settings().company_name_english,
-                                    "gstin": get_settings().gstin,
-                                    },
-                       "backup_date": datetime.now().isoformat(),
-                       }
-
-            return send_file(
-            io.BytesIO(
-                json.dumps(
-                    backup_data,
-                    indent=2,
-                    ensure_ascii=False).encode("utf-8")),
-            mimetype="application/json",
-            as_attachment=True,
-            download_name=f"backup_{
-                datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            )
+            return json_backup_response(admin_backup_sections())
         except Exception as e:
-                flash(f"Error creating backup: {str(e)}", "danger")
-                return redirect(url_for("admin_panel"))
+            flash(f"Error creating backup: {str(e)}", "danger")
+            return redirect(url_for("admin_panel"))
+
+    @app.route("/admin/backup/refresh", methods=["POST"])
+    @role_required("admin")
+    def admin_backup_refresh():
+        """Ask the background writer to rebuild the backup now"""
+        if _backup_writer is None:
+            flash("Backups are built when downloaded on this server", "info")
+        else:
+            _backup_wakeup.set()
+            flash("Backup refresh started - download it again in a minute", "success")
+        return redirect(url_for("admin_backup_page"))
+
+    def admin_backup_sqlite():
+        """Download a consistent copy of the SQLite database file"""
+        fd, backup_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        try:
+            if not backup_sqlite_database(backup_path):
+                flash("Database file backup is only available with SQLite", "warning")
+                return redirect(url_for("admin_backup_page"))
+            # Unlink once opened; send_file hands the open file to the
+            # server's wsgi.file_wrapper, which can stream it with sendfile
+            backup_file = open(backup_path, "rb")
+        finally:
+            os.remove(backup_path)
+        return send_file(
+            backup_file,
+            mimetype="application/vnd.sqlite3",
+            as_attachment=True,
+            download_name=f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sqlite3",
+        )
 
     @app.route("/admin/restore", methods=["POST"])
     @role_required("admin")
@@ -2074,11 +3176,19 @@ def register_routes(app):
         # Error handling
         # ------------------------------------------------------------
 
+    @app.errorhandler(429)
+    def too_many_requests(err):
+        # Only the login form is rate limited
+        return render_template(
+            "login.html",
+            error="Too many failed login attempts. Please try again in a minute."), 429
+
     @app.errorhandler(Exception)
     def handle_exception(err):
-        import traceback
-        print("⚠️ Error:", err)
-        traceback.print_exc()
+        # 404s, 405s and the like keep their own status
+        if isinstance(err, HTTPException):
+            return err
+        logger.exception("⚠️ Error: %s", err)
         message = "An error occurred. Please try again." if RUNNING_ON_VERCEL else str(
             err)
         return render_template("error.html", error=message), 500
@@ -2099,25 +3209,48 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(
         hours=8)  # 8 hour session timeout
 
+    # Templates only change on deploy - skip the mtime check per render and
+    # keep compiled template bytecode on disk so new workers skip parsing
+    development = os.getenv("FLASK_ENV") == "development"
+    app.config['TEMPLATES_AUTO_RELOAD'] = development
+    app.jinja_env.auto_reload = development
+    # Vercel only allows writes under /tmp
+    cache_dir = os.path.join(
+        tempfile.gettempdir() if RUNNING_ON_VERCEL else app.instance_path,
+        "jinja_cache")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    except OSError as err:
+        print("⚠️ Jinja bytecode cache disabled:", err)
+
     # Configure database
     configure_database(app)
 
     # Initialize login manager
     login_manager.init_app(app)
 
+    # Initialize rate limiter
+    limiter.init_app(app)
+
     # Register all routes
     register_routes(app)
-
-    # Tamil font registration for PDF outputs
-    FONT_PATH = os.path.join("static", "fonts", "NotoSansTamil-Regular.ttf")
-    if os.path.exists(FONT_PATH):
-        try:
-            pdfmetrics.registerFont(TTFont("TamilFont", FONT_PATH))
-            print("✅ Tamil font registered successfully")
-        except Exception as err:
-            print("⚠️ Tamil font registration failed:", err)
-    else:
-        print("⚠️ Tamil font missing at static/fonts/NotoSansTamil-Regular.ttf")
+    if TRUSTED_PROXIES:
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+    app.wsgi_app = ping_shortcut(app.wsgi_app)
+
+    # Write audit events and send notifications in the background where the
+    # process is long-lived
+    if is_database_ready() and not RUNNING_ON_VERCEL:
+        start_audit_writer(app)
+        start_notification_sender(app)
+
+    # Long-lived servers load reportlab and parse the Tamil font at boot so
+    # the first PDF request doesn't pay for it; serverless cold starts
+    # leave it to the first render
+    if not RUNNING_ON_VERCEL:
+        get_pdf_font()
 
     # Test connection on startup
     if is_database_ready():
@@ -2133,9 +3266,37 @@ def create_app():
             print("⚠️ App will continue but database operations may fail")
         else:
             print("⚠️ DATABASE_URL not set - database features will be unavailable")
+
+    # Started after init_db so the first backup finds the tables
+    if is_database_ready() and not RUNNING_ON_VERCEL:
+        start_backup_writer(app)
     return app
 
 
+# ------------------------------------------------------------
+# Health check shortcut
+# ------------------------------------------------------------
+PING_BODY = b'{"status":"ok"}'
+PING_HEADERS = [
+    ("Content-Type", "application/json"),
+    ("Content-Length", str(len(PING_BODY))),
+]
+
+
+def ping_shortcut(wsgi_app):
+    """
+    Answer GET/HEAD /ping before Flask sees the request, so uptime
+    monitors skip routing, request hooks and jsonify. Everything else
+    goes to wsgi_app.
+    """
+    def app_with_ping(environ, start_response):
+        if environ.get("PATH_INFO") == "/ping" and environ.get("REQUEST_METHOD") in ("GET", "HEAD"):
+            start_response("200 OK", PING_HEADERS)
+            return [] if environ["REQUEST_METHOD"] == "HEAD" else [PING_BODY]
+        return wsgi_app(environ, start_response)
+    return app_with_ping
+
+
 # Create app instance
 app = create_app()
 
@@ -1,5 +1,8 @@
 import os
-from sqlalchemy import create_engine
+import sqlite3
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm import sessionmaker
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.engine.url import make_url
@@ -11,6 +14,70 @@ engine = None
 SessionLocal = None
 
 
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Switch SQLite connections to WAL journaling with NORMAL fsync.
+    Readers no longer block the writer and commits avoid a full fsync.
+    PostgreSQL connections are left untouched.
+
+    New connections also run PRAGMA optimize, which refreshes planner
+    statistics for tables that need them so the report indexes are
+    chosen correctly. Pooled connections are long-lived, so this is rare.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA optimize=0x10002")
+    cursor.close()
+
+
+def get_engine_options(url):
+    """
+    Engine/pool options for the configured backend.
+
+    SQLite keeps a persistent pool of file connections shared across
+    threads (an in-memory database needs a single StaticPool connection);
+    the WAL pragmas are applied by _set_sqlite_pragmas on connect.
+    Server databases use a sized QueuePool from the DB_POOL_* env vars.
+
+    Every backend gets a compiled-statement cache sized by
+    DB_QUERY_CACHE_SIZE (SQLAlchemy's default is 500), so all of the app's
+    repeated queries stay compiled for the life of the process.
+    """
+    query_cache_size = int(os.getenv("DB_QUERY_CACHE_SIZE", 1200))
+
+    if url.get_backend_name() == "sqlite":
+        connect_args = {"check_same_thread": False, "timeout": 30}
+        if url.database in (None, "", ":memory:"):
+            return {
+                "poolclass": StaticPool,
+                "connect_args": connect_args,
+                "query_cache_size": query_cache_size,
+            }
+        return {
+            "poolclass": QueuePool,
+            "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+            "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+            "connect_args": connect_args,
+            "query_cache_size": query_cache_size,
+        }
+
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_pre_ping": True,
+        "query_cache_size": query_cache_size,
+    }
+
+
 def configure_database(app):
     """
     Configure SQLAlchemy to use PostgreSQL via DATABASE_URL env var.
@@ -36,26 +103,19 @@ def configure_database(app):
     if url.drivername == "postgresql":
         url = url.set(drivername="postgresql+psycopg2")
 
+    engine_options = get_engine_options(url)
+    # str(url) masks the password as "***" on SQLAlchemy 2.x
+    database_uri = url.render_as_string(hide_password=False)
+
     # Create engine with pooling
-    engine = create_engine(
-        str(url),
-        pool_size=5,
-        max_overflow=10,
-        pool_timeout=30,
-        pool_pre_ping=True,
-    )
+    engine = create_engine(database_uri, **engine_options)
 
     # Create sessionmaker
     SessionLocal = sessionmaker(bind=engine)
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = str(url)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_size": 5,
-        "max_overflow": 10,
-        "pool_timeout": 30,
-        "pool_pre_ping": True,
-    }
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
 
     db.init_app(app)
     DATABASE_READY = True
@@ -65,3 +125,34 @@ def configure_database(app):
 def is_database_ready():
     return DATABASE_READY
 
+
+def sqlite_database_path():
+    """Return the database file path when running on SQLite, else None"""
+    if not DATABASE_READY or engine is None:
+        return None
+    url = engine.url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return url.database
+
+
+def backup_sqlite_database(dest_path):
+    """
+    Copy the SQLite database to dest_path with sqlite3's online backup API.
+    Pages are copied inside SQLite, giving a consistent snapshot without
+    blocking writers for the whole copy.
+
+    Returns:
+        bool: True when a backup was written, False when not on SQLite
+    """
+    source_path = sqlite_database_path()
+    if not source_path:
+        return False
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+    return True
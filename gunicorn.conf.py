@@ -0,0 +1,31 @@
+"""Gunicorn settings - loaded automatically by `gunicorn app:app`."""
+import os
+
+# Threaded workers: while one request is rendering a PDF or waiting on the
+# database, the same worker keeps serving the others. GUNICORN_WORKER_CLASS
+# can select an async worker (e.g. "gevent") where that package is
+# installed, but sqlite3 and psycopg2 block the event loop unless patched,
+# so gthread is the default.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+# Concurrent requests per gevent worker; ignored by gthread
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 200))
+
+
+def post_fork(server, worker):
+    """Let psycopg2 yield to other greenlets while it waits on PostgreSQL.
+
+    Gevent workers patch sockets themselves, but psycopg2 talks to the
+    server from C and needs psycogreen's wait callback. SQLite has no such
+    hook, so gevent is only worth it on PostgreSQL.
+    """
+    if worker_class != "gevent":
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning(
+            "⚠️ psycogreen not installed - database queries will block gevent workers")
+        return
+    patch_psycopg()